@@ -9,37 +9,256 @@ This module provides core functionality to:
 Chunking logic is handled by Claude Code directly, not by pre-written scripts.
 """
 
+import hashlib
 import os
+import sqlite3
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+# Configure CPU threading before torch loads so encode uses every core
+# without oversubscribing (override with AI_PARTNER_NUM_THREADS)
+_NUM_THREADS = int(os.environ.get("AI_PARTNER_NUM_THREADS", os.cpu_count() or 1))
+os.environ.setdefault("OMP_NUM_THREADS", str(_NUM_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(_NUM_THREADS))
+
 import chromadb
+from chromadb.config import Settings
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 
+torch.set_num_threads(_NUM_THREADS)
+try:
+    torch.set_num_interop_threads(max(1, _NUM_THREADS // 2))
+except RuntimeError:
+    # Already configured by the host process
+    pass
+
+
+def detect_device() -> str:
+    """
+    Pick the encode device: $AI_PARTNER_DEVICE if set, else CUDA, MPS or CPU.
+
+    Returns:
+        Device string accepted by SentenceTransformer
+    """
+    override = os.environ.get("AI_PARTNER_DEVICE")
+    if override:
+        return override
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def load_embedding_model(model_name: str, backend: str = "torch",
+                         onnx_file: Optional[str] = None,
+                         device: Optional[str] = None) -> SentenceTransformer:
+    """
+    Load a sentence transformer with the requested inference backend.
+
+    The ONNX backend (sentence-transformers>=3.2 with the ``onnx`` extra)
+    exports the model on first use; pass ``onnx_file`` to pick an optimized
+    or INT8-quantized variant. On CUDA the torch model is cast to FP16.
+
+    Args:
+        model_name: Sentence transformer model name or local path
+        backend: 'torch' or 'onnx'
+        onnx_file: Optional ONNX file name, e.g. 'onnx/model_O4.onnx'
+        device: Encode device, defaults to detect_device()
+
+    Returns:
+        Loaded SentenceTransformer
+    """
+    device = device or detect_device()
+    if backend == "onnx":
+        model_kwargs = {"file_name": onnx_file} if onnx_file else None
+        return SentenceTransformer(model_name, device=device, backend="onnx",
+                                   model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device=device)
+    if model.device.type == "cuda":
+        model.half()
+    return model
+
+
+def configure_hnsw_params(vector_count: int) -> Dict[str, int]:
+    """
+    Pick HNSW build/search parameters sized for the expected corpus.
+
+    These are fixed when the collection is created; re-run initialize_db
+    with a new expected_chunks to change them.
+
+    Args:
+        vector_count: Expected number of vectors in the collection
+
+    Returns:
+        ChromaDB collection metadata entries (hnsw:*)
+    """
+    if vector_count < 100_000:
+        m, construction_ef, search_ef = 16, 100, 40
+    elif vector_count < 1_000_000:
+        m, construction_ef, search_ef = 24, 100, 100
+    else:
+        m, construction_ef, search_ef = 32, 128, 200
+
+    return {
+        "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef,
+        "hnsw:batch_size": 1000,
+        "hnsw:sync_threshold": 10000,
+    }
+
+
+class EmbeddingCache:
+    """
+    Persistent content-hash -> embedding cache backed by SQLite.
+
+    Vectors are keyed by blake2b(model name + precision + text), so unchanged
+    chunks are not re-encoded when the notes are re-indexed. They are stored
+    either as float16 or as int8 with a per-vector float32 scale (symmetric
+    scalar quantization, ~4x smaller than float32 at >99% recall for
+    normalized embeddings).
+
+    The precision only affects this cache file: vectors are decoded back to
+    float32 before they are handed to ChromaDB, which always stores float32
+    in its HNSW index, so int8 does not reduce index size or memory.
+    """
+
+    PRECISIONS = ("float16", "int8")
+
+    def __init__(self, path: str, model_name: str, precision: str = "float16"):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: Path to the SQLite cache file
+            model_name: Embedding model name, mixed into every key
+            precision: Storage precision, 'float16' or 'int8'
+        """
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"Unsupported cache precision: {precision}")
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.precision = precision
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+
+    def key(self, text: str) -> bytes:
+        """Return the cache key for a text."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.model_name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(self.precision.encode("ascii"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Look up vectors for the given keys; missing keys are omitted."""
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE hash IN ({placeholders})", batch
+            )
+            for h, blob in rows:
+                found[h] = self._decode(blob)
+        return found
+
+    def set_many(self, items: Dict[bytes, np.ndarray]) -> None:
+        """Store vectors at the cache precision for the given keys."""
+        rows = [(h, self._encode(np.asarray(vector, dtype=np.float32)))
+                for h, vector in items.items()]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)", rows
+            )
+
+    def _encode(self, vector: np.ndarray) -> bytes:
+        """Serialize a float32 vector at the cache precision."""
+        if self.precision == "int8":
+            scale = float(np.abs(vector).max()) / 127.0 or 1.0
+            quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+            return np.float32(scale).tobytes() + quantized.tobytes()
+        return vector.astype(np.float16).tobytes()
+
+    def _decode(self, blob: bytes) -> np.ndarray:
+        """Deserialize a stored vector back to float32."""
+        if self.precision == "int8":
+            scale = np.frombuffer(blob, dtype=np.float32, count=1)[0]
+            return np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32) * scale
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.conn.close()
+
 
 class VectorIndexer:
     """Handle vector database indexing operations."""
 
-    def __init__(self, db_path: str = "./vector_db", model_name: str = "BAAI/bge-m3"):
+    def __init__(self, db_path: str = "./vector_db", model_name: str = "BAAI/bge-m3",
+                 batch_size: int = 64, add_batch_size: int = 5000,
+                 backend: Optional[str] = None, onnx_file: Optional[str] = None,
+                 cache_path: Optional[str] = None, cache_precision: str = "float16"):
         """
         Initialize indexer.
 
         Args:
             db_path: Path to ChromaDB database
             model_name: Sentence transformer model name
+            batch_size: Number of chunks encoded per model forward pass
+            add_batch_size: Maximum number of chunks per ChromaDB add call
+            backend: Inference backend ('torch' or 'onnx'), defaults to
+                $AI_PARTNER_EMBED_BACKEND or 'torch'
+            onnx_file: ONNX model file inside the model repo (e.g. an O4 or
+                INT8-quantized export), defaults to $AI_PARTNER_ONNX_FILE
+            cache_path: SQLite embedding cache file, defaults to
+                <db_path>_cache/embedding_cache.sqlite3 (kept outside the
+                ChromaDB directory)
+            cache_precision: Cached vector precision, 'float16' or 'int8'
+                (cache-only; ChromaDB still stores float32)
         """
         self.db_path = db_path
         self.model_name = model_name
+        self.backend = backend or os.environ.get("AI_PARTNER_EMBED_BACKEND", "torch")
+        self.onnx_file = onnx_file or os.environ.get("AI_PARTNER_ONNX_FILE")
+        self.batch_size = batch_size
+        self.add_batch_size = add_batch_size
+        self.cache_path = cache_path or os.path.join(
+            os.path.normpath(db_path) + "_cache", "embedding_cache.sqlite3"
+        )
+        self.cache_precision = cache_precision
+        self.cache = None
         self.model = None
         self.client = None
         self.collection = None
 
-    def initialize_db(self):
-        """Initialize or recreate vector database."""
-        print(f"🤖 Loading embedding model ({self.model_name})...")
-        self.model = SentenceTransformer(self.model_name)
+    def initialize_db(self, expected_chunks: int = 0):
+        """
+        Initialize or recreate vector database.
+
+        Args:
+            expected_chunks: Expected number of chunks, used to size the
+                HNSW index parameters
+        """
+        print(f"🤖 Loading embedding model ({self.model_name}, backend={self.backend})...")
+        self.model = load_embedding_model(self.model_name, self.backend, self.onnx_file)
 
         print(f"💾 Initializing vector database at: {self.db_path}")
-        self.client = chromadb.PersistentClient(path=self.db_path)
+        self.client = chromadb.PersistentClient(
+            path=self.db_path,
+            settings=Settings(anonymized_telemetry=False)
+        )
 
         # Delete existing collection
         try:
@@ -48,67 +267,169 @@ class VectorIndexer:
         except:
             pass
 
-        # Create new collection
+        # Create new collection (embeddings are L2-normalized at encode time,
+        # so inner product equals cosine similarity without re-normalizing)
         self.collection = self.client.create_collection(
             name="notes",
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "ip", **configure_hnsw_params(expected_chunks)}
         )
         print("   Created new collection")
 
-    def index_chunks(self, chunks: List[Dict]) -> None:
+    def index_chunks(self, chunks: List[Dict]) -> int:
         """
         Index chunks into vector database.
 
         Args:
             chunks: List of chunks conforming to chunk_schema.Chunk format
+
+        Returns:
+            Number of chunks actually written to the collection
         """
         if not self.collection:
             raise RuntimeError("Database not initialized. Call initialize_db() first")
 
         print(f"🔄 Indexing {len(chunks)} chunks...")
 
+        # Collect valid chunks so the model can encode them in one batched call
+        ids = []
+        texts = []
+        metadatas = []
         for i, chunk in enumerate(chunks):
-            try:
-                # Validate chunk has required fields
-                if 'content' not in chunk or 'metadata' not in chunk:
-                    print(f"  ⚠️  Skipping chunk {i}: missing content or metadata")
-                    continue
+            # Validate chunk has required fields
+            if 'content' not in chunk or 'metadata' not in chunk:
+                print(f"  ⚠️  Skipping chunk {i}: missing content or metadata")
+                continue
+
+            # Prepare metadata (convert all to strings for ChromaDB)
+            metadata = {}
+            for key, value in chunk['metadata'].items():
+                metadata[key] = str(value) if value is not None else ""
 
-                # Generate embedding
-                embedding = self.model.encode(chunk['content']).tolist()
+            ids.append(f"chunk_{i}")
+            texts.append(chunk['content'])
+            metadatas.append(metadata)
 
-                # Prepare metadata (convert all to strings for ChromaDB)
-                metadata = {}
-                for key, value in chunk['metadata'].items():
-                    metadata[key] = str(value) if value is not None else ""
+        if not texts:
+            print("  ⚠️  No valid chunks to index")
+            return 0
 
-                # Add to collection
+        # The cache connection is only held while embedding
+        self.cache = EmbeddingCache(self.cache_path, self.model_name,
+                                    precision=self.cache_precision)
+        try:
+            embeddings = self._embed(texts)
+        finally:
+            self.cache.close()
+            self.cache = None
+
+        # Add to collection in one bulk call; fall back to slices if it is
+        # rejected (e.g. above ChromaDB's max batch size)
+        try:
+            self.collection.add(
+                ids=ids,
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=metadatas
+            )
+            indexed = len(ids)
+            print(f"  ✓ Indexed {indexed}/{len(ids)} chunks")
+        except Exception as e:
+            print(f"  ⚠️  Bulk add failed ({e}), retrying in batches of {self.add_batch_size}")
+            indexed = self._add_in_batches(ids, embeddings, texts, metadatas)
+
+        failed = len(ids) - indexed
+        if failed:
+            print(f"\n⚠️  Indexed {indexed} chunks, {failed} failed")
+        else:
+            print(f"\n✅ Successfully indexed {indexed} chunks")
+        print(f"   Database location: {os.path.abspath(self.db_path)}")
+        return indexed
+
+    def _add_in_batches(self, ids: List[str], embeddings: np.ndarray,
+                        texts: List[str], metadatas: List[Dict]) -> int:
+        """Add prepared chunks in add_batch_size slices; return how many were written."""
+        indexed = 0
+        for start in range(0, len(ids), self.add_batch_size):
+            end = start + self.add_batch_size
+            try:
                 self.collection.add(
-                    ids=[f"chunk_{i}"],
-                    embeddings=[embedding],
-                    documents=[chunk['content']],
-                    metadatas=[metadata]
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    documents=texts[start:end],
+                    metadatas=metadatas[start:end]
                 )
+                indexed += len(ids[start:end])
+                print(f"  ✓ Indexed {indexed}/{len(ids)} chunks")
+            except Exception as e:
+                print(f"  ✗ Failed to index chunks {start}-{min(end, len(ids)) - 1}: {e}")
+        return indexed
 
-                # Progress indicator
-                if (i + 1) % 10 == 0:
-                    print(f"  ✓ Indexed {i + 1}/{len(chunks)} chunks")
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts, fanning out over all GPUs when more than one is available."""
+        if self.model.device.type == "cuda" and torch.cuda.device_count() > 1:
+            pool = self.model.start_multi_process_pool()
+            try:
+                embeddings = self.model.encode_multi_process(
+                    texts, pool, batch_size=self.batch_size, normalize_embeddings=True
+                )
+            finally:
+                self.model.stop_multi_process_pool(pool)
+            return embeddings
 
-            except Exception as e:
-                print(f"  ✗ Failed to index chunk {i}: {e}")
+        # Batched encode; SBERT sorts by length to minimise padding
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            show_progress_bar=True,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
 
-        print(f"\n✅ Successfully indexed {len(chunks)} chunks")
-        print(f"   Database location: {os.path.abspath(self.db_path)}")
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts, reusing cached vectors for content seen before.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        keys = [self.cache.key(text) for text in texts]
+        cached = self.cache.get_many(keys)
 
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                misses.setdefault(key, text)
+        print(f"  ♻️  Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} to encode")
 
-def index_chunks_to_db(chunks: List[Dict], db_path: str = "./vector_db") -> None:
+        if misses:
+            encoded = self._encode(list(misses.values()))
+            new_vectors = dict(zip(misses.keys(), encoded))
+            self.cache.set_many(new_vectors)
+            cached.update(new_vectors)
+
+        # Fill one contiguous float32 buffer; ChromaDB takes it without boxing
+        # every component into a Python float
+        first = cached[keys[0]]
+        embeddings = np.empty((len(keys), first.shape[0]), dtype=np.float32)
+        for row, key in enumerate(keys):
+            embeddings[row] = cached[key]
+        return embeddings
+
+
+def index_chunks_to_db(chunks: List[Dict], db_path: str = "./vector_db") -> int:
     """
     Convenience function to index chunks.
 
     Args:
         chunks: List of chunks conforming to chunk_schema.Chunk
         db_path: Path to vector database
+
+    Returns:
+        Number of chunks written to the collection
     """
     indexer = VectorIndexer(db_path=db_path)
-    indexer.initialize_db()
-    indexer.index_chunks(chunks)
+    indexer.initialize_db(expected_chunks=len(chunks))
+    return indexer.index_chunks(chunks)
@@ -5,23 +5,44 @@ This module provides functions to query the vector database programmatically.
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional
+
+# Imported before torch so its CPU thread configuration applies here too
+from vector_indexer import load_embedding_model
+
 import chromadb
 from sentence_transformers import SentenceTransformer
 
 
+@lru_cache(maxsize=None)
+def _load_model(model_name: str, backend: str, onnx_file: Optional[str]) -> SentenceTransformer:
+    """Load the embedding model once per process."""
+    return load_embedding_model(model_name, backend, onnx_file)
+
+
 class NoteRetriever:
     """Handle vector database operations for note retrieval."""
 
-    def __init__(self, db_path: str = "./vector_db"):
+    def __init__(self, db_path: str = "./vector_db", backend: Optional[str] = None,
+                 onnx_file: Optional[str] = None, query_cache_size: int = 1024):
         """
         Initialize the retriever with a database path.
 
         Args:
             db_path: Path to ChromaDB database
+            backend: Inference backend ('torch' or 'onnx'), defaults to
+                $AI_PARTNER_EMBED_BACKEND or 'torch'
+            onnx_file: ONNX model file inside the model repo, defaults to
+                $AI_PARTNER_ONNX_FILE
+            query_cache_size: Number of query embeddings kept in memory
         """
         self.db_path = db_path
+        self.backend = backend or os.environ.get("AI_PARTNER_EMBED_BACKEND", "torch")
+        self.onnx_file = onnx_file or os.environ.get("AI_PARTNER_ONNX_FILE")
+        # Per-instance LRU so repeated queries skip the model forward pass
+        self._embed_query = lru_cache(maxsize=query_cache_size)(self._encode_query)
         self.model = None
         self.client = None
         self.collection = None
@@ -29,7 +50,7 @@ class NoteRetriever:
     def _ensure_initialized(self):
         """Lazy initialization of model and database connection."""
         if self.model is None:
-            self.model = SentenceTransformer('BAAI/bge-m3')
+            self.model = _load_model('BAAI/bge-m3', self.backend, self.onnx_file)
 
         if self.client is None:
             try:
@@ -41,6 +62,10 @@ class NoteRetriever:
                     f"Please run init_vector_db.py first. Error: {e}"
                 )
 
+    def _encode_query(self, query: str) -> tuple:
+        """Embed a query, normalized to match the inner-product index."""
+        return tuple(self.model.encode(query, normalize_embeddings=True).tolist())
+
     def query(self, query: str, top_k: int = 5) -> List[Dict[str, str]]:
         """
         Query the vector database for similar notes.
@@ -54,8 +79,8 @@ class NoteRetriever:
         """
         self._ensure_initialized()
 
-        # Generate query embedding
-        query_embedding = self.model.encode(query).tolist()
+        # Generate query embedding (cached)
+        query_embedding = list(self._embed_query(query))
 
         # Query collection
         results = self.collection.query(
@@ -80,6 +105,10 @@ class NoteRetriever:
         return similar_notes
 
 
+# Retrievers shared by get_relevant_notes, keyed by database path
+_retrievers: Dict[str, NoteRetriever] = {}
+
+
 def get_relevant_notes(query: str, db_path: str = "./vector_db", top_k: int = 5) -> List[Dict[str, str]]:
     """
     Convenience function to retrieve relevant notes.
@@ -92,5 +121,9 @@ def get_relevant_notes(query: str, db_path: str = "./vector_db", top_k: int = 5)
     Returns:
         List of dicts with 'content', 'path', 'filename' keys
     """
-    retriever = NoteRetriever(db_path)
+    retriever = _retrievers.get(db_path)
+    if retriever is None:
+        retriever = NoteRetriever(db_path)
+        retriever._ensure_initialized()
+        _retrievers[db_path] = retriever
     return retriever.query(query, top_k)
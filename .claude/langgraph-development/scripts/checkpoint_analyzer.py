@@ -10,11 +10,27 @@ LangGraph检查点分析工具
 import asyncio
 import json
 import sys
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
 import argparse
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 try:
     from langgraph.checkpoint.memory import MemorySaver
     from langgraph.checkpoint.postgres import PostgresSaver
@@ -25,52 +41,120 @@ except ImportError as e:
     sys.exit(1)
 
 
-class CheckpointAnalyzer:
-    """LangGraph检查点分析器"""
-
-    def __init__(self, checkpointer, config: Dict[str, Any] = None):
-        self.checkpointer = checkpointer
-        self.config = config or {}
-        self.analysis_results = {}
-
-    async def analyze_thread_history(self, thread_id: str) -> Dict[str, Any]:
-        """分析特定线程的完整历史"""
-        print(f"[INFO] 分析线程 {thread_id} 的历史...")
-
+# 报告与循环模式中展示的最大节点数
+NODE_SEQUENCE_PREVIEW = 50
+LOOP_PATTERN_PREVIEW = 10
+
+# 节点序列超过该长度时使用numba编译的循环检测（小序列不值得付出JIT开销）
+NUMBA_LOOP_THRESHOLD = 10_000
+
+
+if njit is not None and np is not None:
+    @njit(cache=True)
+    def _loop_bounds_nb(codes, n_codes):
+        """numba内核：基于整数节点编码计算循环的起止下标"""
+        last_seen = np.full(n_codes, -1, dtype=np.int64)
+        starts = np.empty(codes.shape[0], dtype=np.int64)
+        ends = np.empty(codes.shape[0], dtype=np.int64)
+        count = 0
+        for j in range(codes.shape[0]):
+            code = codes[j]
+            i = last_seen[code]
+            if i >= 0 and j - i > 1:
+                starts[count] = i
+                ends[count] = j
+                count += 1
+            last_seen[code] = j
+        return starts[:count], ends[:count]
+else:
+    _loop_bounds_nb = None
+
+
+def _join_preview(nodes: List[str], limit: int) -> str:
+    """只拼接前limit个节点，避免为长序列构造超大字符串"""
+    preview = " -> ".join(nodes[:limit])
+    if len(nodes) > limit:
+        preview += f" ... (+{len(nodes) - limit} more)"
+    return preview
+
+
+def _loop_preview(node_sequence: List[str], i: int, j: int) -> str:
+    """循环 node_sequence[i..j] 的预览：只切片前LOOP_PATTERN_PREVIEW个节点，不复制整个循环"""
+    total = j + 1 - i
+    preview = " -> ".join(node_sequence[i:i + min(total, LOOP_PATTERN_PREVIEW)])
+    if total > LOOP_PATTERN_PREVIEW:
+        preview += f" ... (+{total - LOOP_PATTERN_PREVIEW} more)"
+    return preview
+
+
+def _serialized_size(value: Any) -> int:
+    """估算状态序列化后的字节数（优先使用orjson）"""
+    if not value:
+        return 0
+    if orjson is not None:
         try:
-            # 获取检查点历史
-            checkpoints = []
-            async for checkpoint in self.checkpointer.alist(thread_id):
-                checkpoints.append(checkpoint)
-
-            if not checkpoints:
-                return {"error": f"线程 {thread_id} 没有检查点数据"}
-
-            # 分析统计数据
-            analysis = {
-                "thread_id": thread_id,
-                "total_checkpoints": len(checkpoints),
-                "time_span": self._calculate_time_span(checkpoints),
-                "execution_pattern": self._analyze_execution_pattern(checkpoints),
-                "state_evolution": self._analyze_state_evolution(checkpoints),
-                "performance_metrics": self._calculate_performance_metrics(checkpoints),
-                "error_patterns": self._identify_error_patterns(checkpoints),
-                "checkpoints": checkpoints
-            }
-
-            return analysis
-
-        except Exception as e:
-            return {"error": f"分析失败: {str(e)}"}
-
-    def _calculate_time_span(self, checkpoints: List) -> Dict[str, Any]:
-        """计算时间跨度"""
-        if len(checkpoints) < 2:
+            return len(orjson.dumps(value, default=str))
+        except TypeError:
+            pass
+    return len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+class CheckpointFields(NamedTuple):
+    """每个检查点只提取一次的元数据字段，供所有聚合器共享"""
+    ts: Any
+    source: Any
+    has_source: bool
+    step: Any
+    error: Any
+    writes: Any
+
+
+def _extract_fields(checkpoint) -> CheckpointFields:
+    """一次性读取检查点元数据，避免各聚合器重复查字典"""
+    metadata = checkpoint.metadata
+    get = metadata.get
+    return CheckpointFields(
+        ts=get("ts"),
+        source=get("source"),
+        has_source="source" in metadata,
+        step=get("step"),
+        error=get("error"),
+        writes=get("writes"),
+    )
+
+
+class StreamingAggregator(ABC):
+    """检查点流式聚合器基类：逐个接收检查点，最后汇总结果"""
+
+    @abstractmethod
+    def update(self, index: int, checkpoint, fields: CheckpointFields) -> None:
+        """处理一个检查点"""
+
+    @abstractmethod
+    def finalize(self) -> Any:
+        """返回聚合结果"""
+
+
+class TimeSpanAggregator(StreamingAggregator):
+    """计算时间跨度"""
+
+    def __init__(self):
+        self.count = 0
+        self.start_time = None
+        self.end_time = None
+
+    def update(self, index: int, checkpoint, fields: CheckpointFields) -> None:
+        ts = fields.ts
+        if self.count == 0:
+            self.start_time = ts
+        self.end_time = ts
+        self.count += 1
+
+    def finalize(self) -> Dict[str, Any]:
+        if self.count < 2:
             return {"duration_seconds": 0, "start_time": None, "end_time": None}
 
-        start_time = checkpoints[0].metadata.get("ts")
-        end_time = checkpoints[-1].metadata.get("ts")
-
+        start_time, end_time = self.start_time, self.end_time
         if start_time and end_time:
             duration = (end_time - start_time).total_seconds()
             return {
@@ -82,94 +166,132 @@ class CheckpointAnalyzer:
 
         return {"duration_seconds": 0, "start_time": None, "end_time": None}
 
-    def _analyze_execution_pattern(self, checkpoints: List) -> Dict[str, Any]:
-        """分析执行模式"""
-        pattern = {
+
+class ExecutionPatternAggregator(StreamingAggregator):
+    """分析执行模式"""
+
+    def __init__(self, detect_loops):
+        self.detect_loops = detect_loops
+        self.pattern = {
             "node_sequence": [],
             "execution_frequency": {},
             "branch_points": [],
             "loop_patterns": []
         }
 
-        for checkpoint in checkpoints:
-            # 提取节点执行信息
-            metadata = checkpoint.metadata
-            if "source" in metadata:
-                pattern["node_sequence"].append(metadata["source"])
-                pattern["execution_frequency"][metadata["source"]] = \
-                    pattern["execution_frequency"].get(metadata["source"], 0) + 1
+    def update(self, index: int, checkpoint, fields: CheckpointFields) -> None:
+        pattern = self.pattern
 
-            # 识别分支点
-            if metadata.get("step") and metadata.get("step") > 1:
-                pattern["branch_points"].append(metadata["step"])
+        # 提取节点执行信息
+        if fields.has_source:
+            source = fields.source
+            pattern["node_sequence"].append(source)
+            pattern["execution_frequency"][source] = \
+                pattern["execution_frequency"].get(source, 0) + 1
 
-        # 识别循环模式
-        pattern["loop_patterns"] = self._detect_loops(pattern["node_sequence"])
+        # 识别分支点
+        step = fields.step
+        if step and step > 1:
+            pattern["branch_points"].append(step)
 
-        return pattern
+    def finalize(self) -> Dict[str, Any]:
+        # 识别循环模式
+        self.pattern["loop_patterns"] = self.detect_loops(self.pattern["node_sequence"])
+        return self.pattern
 
-    def _detect_loops(self, node_sequence: List[str]) -> List[Dict[str, Any]]:
-        """检测循环模式"""
-        loops = []
-        sequence_str = " -> ".join(node_sequence)
-
-        # 简单的循环检测
-        for i in range(len(node_sequence)):
-            for j in range(i + 1, len(node_sequence)):
-                if node_sequence[i] == node_sequence[j]:
-                    # 找到潜在循环
-                    loop_length = j - i
-                    if loop_length > 1:  # 排除相邻重复
-                        loops.append({
-                            "start_index": i,
-                            "end_index": j,
-                            "loop_length": loop_length,
-                            "pattern": " -> ".join(node_sequence[i:j+1])
-                        })
 
-        return loops
+class StateEvolutionAggregator(StreamingAggregator):
+    """分析状态演化"""
 
-    def _analyze_state_evolution(self, checkpoints: List) -> Dict[str, Any]:
-        """分析状态演化"""
-        evolution = {
+    def __init__(self):
+        self.evolution = {
             "state_size_changes": [],
             "key_transitions": [],
             "message_count_trend": [],
             "error_occurrences": []
         }
+        self.previous_state_size = 0
+        self.size_by_channel: Dict[str, int] = {}
+
+    def update(self, index: int, checkpoint, fields: CheckpointFields) -> None:
+        evolution = self.evolution
+
+        # 计算状态大小变化（仅重新序列化本步写入的通道）
+        state_size = self._update_channel_sizes(checkpoint, fields.writes)
+        evolution["state_size_changes"].append({
+            "checkpoint_index": index,
+            "state_size": state_size,
+            "change": state_size - self.previous_state_size
+        })
+        self.previous_state_size = state_size
+
+        # 分析消息数量趋势
+        if "messages" in checkpoint.channel_values:
+            messages = checkpoint.channel_values["messages"]
+            evolution["message_count_trend"].append({
+                "checkpoint_index": index,
+                "message_count": len(messages) if messages else 0
+            })
 
-        previous_state_size = 0
-
-        for i, checkpoint in enumerate(checkpoints):
-            # 计算状态大小变化
-            state_size = len(str(checkpoint.channel_values)) if checkpoint.channel_values else 0
-            evolution["state_size_changes"].append({
-                "checkpoint_index": i,
-                "state_size": state_size,
-                "change": state_size - previous_state_size
+        # 检测错误
+        if fields.error:
+            evolution["error_occurrences"].append({
+                "checkpoint_index": index,
+                "error": fields.error,
+                "timestamp": fields.ts
             })
-            previous_state_size = state_size
-
-            # 分析消息数量趋势
-            if "messages" in checkpoint.channel_values:
-                messages = checkpoint.channel_values["messages"]
-                evolution["message_count_trend"].append({
-                    "checkpoint_index": i,
-                    "message_count": len(messages) if messages else 0
-                })
-
-            # 检测错误
-            if checkpoint.metadata.get("error"):
-                evolution["error_occurrences"].append({
-                    "checkpoint_index": i,
-                    "error": checkpoint.metadata["error"],
-                    "timestamp": checkpoint.metadata.get("ts")
-                })
-
-        return evolution
-
-    def _calculate_performance_metrics(self, checkpoints: List) -> Dict[str, Any]:
-        """计算性能指标"""
+
+    def _update_channel_sizes(self, checkpoint, writes: Any) -> int:
+        """根据检查点的writes增量更新各通道大小，返回状态总大小"""
+        size_by_channel = self.size_by_channel
+        channel_values = checkpoint.channel_values or {}
+
+        # 只有每个节点的写入都是dict（或None）时才能确定改动了哪些通道
+        incremental = (
+            size_by_channel
+            and isinstance(writes, dict)
+            and all(node_writes is None or isinstance(node_writes, dict)
+                    for node_writes in writes.values())
+        )
+
+        if incremental:
+            changed = set()
+            for node_writes in writes.values():
+                if node_writes:
+                    changed.update(node_writes)
+            for channel in changed:
+                if channel in channel_values:
+                    size_by_channel[channel] = _serialized_size(channel_values[channel])
+                else:
+                    size_by_channel.pop(channel, None)
+        else:
+            # 首个检查点、缺少writes信息或写入格式无法识别（列表、Command等）时完整计算
+            size_by_channel.clear()
+            for channel, value in channel_values.items():
+                size_by_channel[channel] = _serialized_size(value)
+
+        return sum(size_by_channel.values())
+
+    def finalize(self) -> Dict[str, Any]:
+        return self.evolution
+
+
+class PerformanceAggregator(StreamingAggregator):
+    """计算性能指标"""
+
+    def __init__(self):
+        self.count = 0
+        self.prev_time = None
+        self.step_times: List[float] = []
+
+    def update(self, index: int, checkpoint, fields: CheckpointFields) -> None:
+        curr_time = fields.ts
+        if self.count > 0 and self.prev_time and curr_time:
+            self.step_times.append((curr_time - self.prev_time).total_seconds())
+        self.prev_time = curr_time
+        self.count += 1
+
+    def finalize(self) -> Dict[str, Any]:
         metrics = {
             "total_execution_time": 0,
             "average_step_time": 0,
@@ -177,62 +299,169 @@ class CheckpointAnalyzer:
             "throughput": 0
         }
 
-        if len(checkpoints) < 2:
-            return metrics
-
-        step_times = []
-        for i in range(1, len(checkpoints)):
-            prev_time = checkpoints[i-1].metadata.get("ts")
-            curr_time = checkpoints[i].metadata.get("ts")
-
-            if prev_time and curr_time:
-                step_time = (curr_time - prev_time).total_seconds()
-                step_times.append(step_time)
-
+        step_times = self.step_times
         if step_times:
-            metrics["total_execution_time"] = sum(step_times)
-            metrics["average_step_time"] = sum(step_times) / len(step_times)
+            # 一次性求和/最大值并筛选最慢步骤（有numpy时向量化）
+            if np is not None:
+                times = np.asarray(step_times, dtype=np.float64)
+                total_time = float(times.sum())
+                max_time = float(times.max())
+                slow_indices = np.flatnonzero(times >= max_time * 0.8).tolist()
+            else:
+                total_time = sum(step_times)
+                max_time = max(step_times)
+                slow_indices = [i for i, time in enumerate(step_times) if time >= max_time * 0.8]
+
+            metrics["total_execution_time"] = total_time
+            metrics["average_step_time"] = total_time / len(step_times)
 
-            # 找出最慢的步骤
-            max_time = max(step_times)
+            # 找出最慢的步骤（最慢80%的步骤）
             metrics["slowest_steps"] = [
                 {
                     "step_index": i + 1,
                     "time_seconds": step_times[i],
                     "time_formatted": str(timedelta(seconds=int(step_times[i])))
                 }
-                for i, time in enumerate(step_times)
-                if time >= max_time * 0.8  # 最慢80%的步骤
+                for i in slow_indices
             ]
 
             # 计算吞吐量
-            total_time = metrics["total_execution_time"]
             if total_time > 0:
                 metrics["throughput"] = len(step_times) / total_time
 
         return metrics
 
-    def _identify_error_patterns(self, checkpoints: List) -> List[Dict[str, Any]]:
-        """识别错误模式"""
-        error_patterns = []
 
-        for i, checkpoint in enumerate(checkpoints):
-            error = checkpoint.metadata.get("error")
-            if error:
-                error_patterns.append({
-                    "checkpoint_index": i,
-                    "error_type": type(error).__name__ if isinstance(error, Exception) else str(type(error)),
-                    "error_message": str(error),
-                    "node": checkpoint.metadata.get("source"),
-                    "timestamp": checkpoint.metadata.get("ts")
-                })
+class ErrorPatternAggregator(StreamingAggregator):
+    """识别错误模式"""
+
+    def __init__(self):
+        self.error_patterns: List[Dict[str, Any]] = []
+
+    def update(self, index: int, checkpoint, fields: CheckpointFields) -> None:
+        error = fields.error
+        if error:
+            self.error_patterns.append({
+                "checkpoint_index": index,
+                "error_type": type(error).__name__,
+                "error_message": str(error),
+                "node": fields.source,
+                "timestamp": fields.ts
+            })
+
+    def finalize(self) -> List[Dict[str, Any]]:
+        return self.error_patterns
+
+
+class CheckpointAnalyzer:
+    """LangGraph检查点分析器"""
+
+    def __init__(self, checkpointer, config: Dict[str, Any] = None):
+        self.checkpointer = checkpointer
+        self.config = config or {}
+        self.analysis_results = {}
+
+    async def analyze_thread_history(self, thread_id: str) -> Dict[str, Any]:
+        """分析特定线程的完整历史"""
+        print(f"[INFO] 分析线程 {thread_id} 的历史...")
+
+        try:
+            # 单次流式遍历检查点历史，不在内存中保留检查点列表
+            aggregators = {
+                "time_span": TimeSpanAggregator(),
+                "execution_pattern": ExecutionPatternAggregator(self._detect_loops),
+                "state_evolution": StateEvolutionAggregator(),
+                "performance_metrics": PerformanceAggregator(),
+                "error_patterns": ErrorPatternAggregator(),
+            }
+
+            total_checkpoints = 0
+            aggregator_list = list(aggregators.values())
+            async for checkpoint in self.checkpointer.alist(thread_id):
+                fields = _extract_fields(checkpoint)
+                for aggregator in aggregator_list:
+                    aggregator.update(total_checkpoints, checkpoint, fields)
+                total_checkpoints += 1
+
+            if not total_checkpoints:
+                return {"error": f"线程 {thread_id} 没有检查点数据"}
+
+            # 分析统计数据
+            analysis = {
+                "thread_id": thread_id,
+                "total_checkpoints": total_checkpoints,
+            }
+            for key, aggregator in aggregators.items():
+                analysis[key] = aggregator.finalize()
+
+            return analysis
+
+        except Exception as e:
+            return {"error": f"分析失败: {str(e)}"}
+
+    def _detect_loops(self, node_sequence: List[str]) -> List[Dict[str, Any]]:
+        """检测循环模式"""
+        if _loop_bounds_nb is not None and len(node_sequence) >= NUMBA_LOOP_THRESHOLD:
+            return self._detect_loops_numba(node_sequence)
+
+        loops = []
+        last_seen = {}
+
+        # 单次遍历：节点再次出现时，与其上一次出现的位置构成一个循环
+        for j, node in enumerate(node_sequence):
+            i = last_seen.get(node)
+            if i is not None:
+                loop_length = j - i
+                if loop_length > 1:  # 排除相邻重复
+                    loops.append({
+                        "start_index": i,
+                        "end_index": j,
+                        "loop_length": loop_length,
+                        "pattern": _loop_preview(node_sequence, i, j)
+                    })
+            last_seen[node] = j
 
-        return error_patterns
+        return loops
+
+    def _detect_loops_numba(self, node_sequence: List[str]) -> List[Dict[str, Any]]:
+        """将节点名映射为整数编码后，用numba内核检测循环"""
+        code_of: Dict[Any, int] = {}
+        codes = np.fromiter(
+            (code_of.setdefault(node, len(code_of)) for node in node_sequence),
+            dtype=np.int64,
+            count=len(node_sequence)
+        )
+        starts, ends = _loop_bounds_nb(codes, len(code_of))
+
+        return [
+            {
+                "start_index": i,
+                "end_index": j,
+                "loop_length": j - i,
+                "pattern": _loop_preview(node_sequence, i, j)
+            }
+            for i, j in zip(starts.tolist(), ends.tolist())
+        ]
+
+    async def analyze_many(self, thread_ids: List[str],
+                           max_concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+        """并发分析多个线程（通过信号量限制对检查点后端的并发请求数）"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def analyze_one(thread_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze_thread_history(thread_id)
+
+        results = await asyncio.gather(*(analyze_one(thread_id) for thread_id in thread_ids))
+        return dict(zip(thread_ids, results))
 
     async def generate_summary_report(self, thread_id: str) -> str:
         """生成汇总报告"""
         analysis = await self.analyze_thread_history(thread_id)
+        return self.format_summary_report(analysis)
 
+    def format_summary_report(self, analysis: Dict[str, Any]) -> str:
+        """根据已有的分析结果生成汇总报告"""
         if "error" in analysis:
             return f"分析失败: {analysis['error']}"
 
@@ -250,7 +479,7 @@ class CheckpointAnalyzer:
 - **吞吐量**: {analysis['performance_metrics'].get('throughput', 0):.2f}步骤/秒
 
 ## 执行模式分析
-- **执行节点序列**: {' -> '.join(analysis['execution_pattern']['node_sequence'])}
+- **执行节点序列**: {_join_preview(analysis['execution_pattern']['node_sequence'], NODE_SEQUENCE_PREVIEW)}
 - **节点执行频率**: {analysis['execution_pattern']['execution_frequency']}
 - **检测到的循环**: {len(analysis['execution_pattern']['loop_patterns'])}
 
@@ -294,15 +523,25 @@ class CheckpointAnalyzer:
 
         return "\n".join(suggestions) if suggestions else "- 当前执行性能良好，无明显优化点"
 
-    async def save_analysis(self, thread_id: str, output_path: str):
-        """保存分析结果到文件"""
-        analysis = await self.analyze_thread_history(thread_id)
-        report = await self.generate_summary_report(thread_id)
+    async def save_analysis(self, thread_id: str, output_path: str,
+                            analysis: Optional[Dict[str, Any]] = None):
+        """保存分析结果到文件（可传入已完成的分析结果以避免重复分析）"""
+        if analysis is None:
+            analysis = await self.analyze_thread_history(thread_id)
+        report = self.format_summary_report(analysis)
 
         # 保存详细分析数据
         analysis_path = Path(output_path) / f"{thread_id}_analysis.json"
-        with open(analysis_path, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, indent=2, default=str, ensure_ascii=False)
+        if orjson is not None:
+            with open(analysis_path, 'wb') as f:
+                f.write(orjson.dumps(
+                    analysis,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+                    default=str
+                ))
+        else:
+            with open(analysis_path, 'w', encoding='utf-8') as f:
+                json.dump(analysis, f, indent=2, default=str, ensure_ascii=False)
 
         # 保存报告
         report_path = Path(output_path) / f"{thread_id}_report.md"
@@ -324,6 +563,10 @@ async def main():
     parser.add_argument("--output", default="./analysis_output", help="输出目录")
     parser.add_argument("--report", action="store_true", help="生成汇总报告")
     parser.add_argument("--list-threads", action="store_true", help="列出所有线程")
+    parser.add_argument("--analyze-all", action="store_true",
+                       help="与--list-threads一起使用，并发分析并保存所有线程")
+    parser.add_argument("--max-concurrency", type=int, default=8,
+                       help="并发分析线程的最大数量")
 
     args = parser.parse_args()
 
@@ -374,6 +617,14 @@ async def main():
                 print(f"[INFO] 找到 {len(threads)} 个线程:")
                 for thread_id in sorted(threads):
                     print(f"  - {thread_id}")
+
+                if args.analyze_all:
+                    print(f"[INFO] 并发分析 {len(threads)} 个线程...")
+                    analyses = await analyzer.analyze_many(
+                        sorted(threads), max_concurrency=args.max_concurrency
+                    )
+                    for thread_id, analysis in analyses.items():
+                        await analyzer.save_analysis(thread_id, output_dir, analysis=analysis)
             else:
                 print("[INFO] 没有找到线程数据")
 
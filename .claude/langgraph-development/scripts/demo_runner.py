@@ -8,113 +8,304 @@ LangGraph演示运行器
 
 import os
 import sys
-import time
+import argparse
 import asyncio
+import ast
+import contextvars
+import io
+import operator
+import re
+import select
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from types import CodeType
+from typing import Dict, List, Any, Literal, Optional, TypedDict, Annotated
 import json
 
+# LangGraph/LangChain 只在导入时加载一次，演示函数中不再重复导入
+try:
+    from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+    from langchain_core.tools import tool
+    from langgraph.graph import StateGraph, END
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.prebuilt import ToolNode
+    _LG_OK = True
+    _LG_ERR = None
+except ImportError as _e:
+    _LG_OK = False
+    _LG_ERR = _e
+
+# 所有演示共用的检查点存储器（以及今后接入的LLM客户端），避免重复创建
+_SHARED_MEMORY = MemorySaver() if _LG_OK else None
+
+try:
+    import uvloop  # 可选：基于libuv的事件循环，降低await开销（Windows不可用）
+except ImportError:
+    uvloop = None
+
+# 计算器工具允许的语法节点（仅算术），以及乘方的指数/结果位数上限
+_CALC_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Pow, ast.Mod,
+    ast.USub, ast.UAdd,
+)
+_CALC_MAX_EXPONENT = 1000
+_CALC_MAX_BITS = 4096
+
+def _calc_pow(base, exponent):
+    """受限乘方：先检查指数和结果位数，避免 9**9**9**9 这类表达式卡死进程"""
+    if abs(exponent) > _CALC_MAX_EXPONENT:
+        raise ValueError(f"指数过大（上限 {_CALC_MAX_EXPONENT}）")
+    if isinstance(base, int) and isinstance(exponent, int) and base.bit_length() * exponent > _CALC_MAX_BITS:
+        raise ValueError("乘方结果过大")
+    return operator.pow(base, exponent)
+
+class _PowToCall(ast.NodeTransformer):
+    """把 a ** b 改写为 _pow(a, b)，由 _calc_pow 在求值时做范围检查"""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            call = ast.Call(func=ast.Name(id='_pow', ctx=ast.Load()),
+                            args=[node.left, node.right], keywords=[])
+            return ast.copy_location(call, node)
+        return node
+
+@lru_cache(maxsize=256)
+def _compile_calc(expr: str) -> CodeType:
+    """AST校验并编译算术表达式（按表达式LRU缓存代码对象）"""
+    tree = ast.parse(expr, mode='eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, _CALC_ALLOWED_NODES):
+            raise ValueError(f"不支持的表达式: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError("只支持数字常量")
+    tree = ast.fix_missing_locations(_PowToCall().visit(tree))
+    return compile(tree, '<calc>', 'eval')
+
+def _safe_eval(expression: str):
+    """安全计算算术表达式：复用缓存的代码对象，乘方经 _calc_pow 限幅"""
+    code = _compile_calc(expression.replace('^', '**'))
+    return eval(code, {"__builtins__": {}, "_pow": _calc_pow}, {})
+
+def _keyword_pattern(keywords) -> "re.Pattern":
+    """把关键词列表编译为单个正则，一次扫描即可判断是否命中任一关键词"""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+# 路由/工具判断用的关键词，导入时预编译
+_MATH_KWS = ("计算", "算", "数学")
+_TRANS_KWS = ("翻译", "english", "英文")
+_MATH_RE = _keyword_pattern(_MATH_KWS)
+_TRANS_RE = _keyword_pattern(_TRANS_KWS)
+
+# 工具路由：每个工具一个命名分组，一次扫描即可得到命中的工具；新增工具只需增加分组
+_TOOL_ROUTER = re.compile(r"(?P<time>时间|几点|time)|(?P<calc>计算|算|[+\-*/])", re.IGNORECASE)
+_NON_ARITH_RE = re.compile(r"[^\d+\-*/%.()\s]")
+
+def _read_line(prompt: str, cancelled: threading.Event) -> str:
+    """读取一行输入。终端上先轮询stdin是否可读，这样取消后工作线程能及时结束，
+    解释器退出时不会卡在阻塞的input()上"""
+    if os.name == "posix" and sys.stdin.isatty():
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        while not select.select([sys.stdin], [], [], 0.1)[0]:
+            if cancelled.is_set():
+                raise EOFError
+        prompt = ""
+    return input(prompt)
+
+@lru_cache(maxsize=128)
+def _analyze(text: str):
+    """文本分析（纯函数，按输入字符串缓存）：返回 (大写文本, 词数)"""
+    return text.upper(), len(text.split())
+
+# 演示配置（静态数据，导入时构建一次）
+_DEMOS: Dict[str, Dict[str, Any]] = {
+    "basic": {
+        "title": "🎯 基础演示",
+        "description": "展示LangGraph的核心概念",
+        "demos": [
+            {
+                "id": "hello_world",
+                "title": "Hello World",
+                "description": "最简单的LangGraph应用",
+                "type": "builtin",
+                "function": "demo_hello_world"
+            },
+            {
+                "id": "state_flow",
+                "title": "状态流转",
+                "description": "演示状态在工作流中的传递",
+                "type": "builtin",
+                "function": "demo_state_flow"
+            },
+            {
+                "id": "conditional_routing",
+                "title": "条件路由",
+                "description": "根据条件决定执行路径",
+                "type": "builtin",
+                "function": "demo_conditional_routing"
+            }
+        ]
+    },
+    "advanced": {
+        "title": "🚀 高级演示",
+        "description": "展示复杂的应用场景",
+        "demos": [
+            {
+                "id": "memory_persistence",
+                "title": "持久化内存",
+                "description": "保存和恢复对话状态",
+                "type": "builtin",
+                "function": "demo_memory_persistence"
+            },
+            {
+                "id": "tool_integration",
+                "title": "工具集成",
+                "description": "集成外部工具和API",
+                "type": "builtin",
+                "function": "demo_tool_integration"
+            },
+            {
+                "id": "error_handling",
+                "title": "错误处理",
+                "description": "优雅地处理错误和异常",
+                "type": "builtin",
+                "function": "demo_error_handling"
+            }
+        ]
+    }
+}
+
+# 扁平化的 (类别, 类别内下标, 演示) 列表，供随机演示直接选取
+_ALL_DEMOS = [
+    (category, index, demo)
+    for category, category_data in _DEMOS.items()
+    for index, demo in enumerate(category_data["demos"])
+]
+
+# 冒烟模式下当前任务的输出缓冲区（每个并发演示各自一份）
+_demo_output: contextvars.ContextVar[Optional[io.StringIO]] = contextvars.ContextVar(
+    "_demo_output", default=None
+)
+
+
+class _DemoStdout:
+    """按当前任务上下文把输出分流到各自缓冲区的stdout代理，避免并发演示输出交错"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        buf = _demo_output.get()
+        return (buf if buf is not None else self._stream).write(text)
+
+    def flush(self):
+        if _demo_output.get() is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
 class DemoRunner:
     """LangGraph演示运行器"""
 
-    def __init__(self):
+    BANNER = """
+🎬 LangGraph 演示运行器
+
+🎯 体验LangGraph的强大功能
+🚀 从简单到复杂的演示示例
+⚡ 即时运行，无需配置
+
+        \n"""
+
+    MAIN_MENU = "\n".join([
+        "请选择演示类别:",
+        "0. 🏠 主菜单",
+        "1. 🎯 基础演示",
+        "2. 🚀 高级演示",
+        "3. 🎲 随机演示",
+        "q. 🚪 退出",
+        "",
+    ])
+
+    def __init__(self, pace: float = 0):
         self.project_root = Path(__file__).parent.parent
-        self.demos = self._load_demos()
-
-    def _load_demos(self) -> Dict:
-        """加载演示配置"""
-        return {
-            "basic": {
-                "title": "🎯 基础演示",
-                "description": "展示LangGraph的核心概念",
-                "demos": [
-                    {
-                        "id": "hello_world",
-                        "title": "Hello World",
-                        "description": "最简单的LangGraph应用",
-                        "type": "builtin",
-                        "function": "demo_hello_world"
-                    },
-                    {
-                        "id": "state_flow",
-                        "title": "状态流转",
-                        "description": "演示状态在工作流中的传递",
-                        "type": "builtin",
-                        "function": "demo_state_flow"
-                    },
-                    {
-                        "id": "conditional_routing",
-                        "title": "条件路由",
-                        "description": "根据条件决定执行路径",
-                        "type": "builtin",
-                        "function": "demo_conditional_routing"
-                    }
-                ]
-            },
-            "advanced": {
-                "title": "🚀 高级演示",
-                "description": "展示复杂的应用场景",
-                "demos": [
-                    {
-                        "id": "memory_persistence",
-                        "title": "持久化内存",
-                        "description": "保存和恢复对话状态",
-                        "type": "builtin",
-                        "function": "demo_memory_persistence"
-                    },
-                    {
-                        "id": "tool_integration",
-                        "title": "工具集成",
-                        "description": "集成外部工具和API",
-                        "type": "builtin",
-                        "function": "demo_tool_integration"
-                    },
-                    {
-                        "id": "error_handling",
-                        "title": "错误处理",
-                        "description": "优雅地处理错误和异常",
-                        "type": "builtin",
-                        "function": "demo_error_handling"
-                    }
-                ]
-            }
+        self.demos = _DEMOS
+        # 每个示例之间的停顿秒数，0表示不停顿
+        self.pace = pace
+        self._graph_cache: Dict[str, Any] = {}
+        self._prewarm_task: Optional[asyncio.Task] = None
+        # 演示ID到演示方法的分派表，缺失的演示函数在启动时即报错
+        self._dispatch = {
+            demo["id"]: getattr(self, demo["function"])
+            for category_data in self.demos.values()
+            for demo in category_data["demos"]
+        }
+        self._menu_text = {
+            category: self._format_demo_menu(category_data)
+            for category, category_data in self.demos.items()
         }
 
     def print_banner(self):
         """打印横幅"""
-        banner = """
-🎬 LangGraph 演示运行器
+        sys.stdout.write(self.BANNER)
+        sys.stdout.flush()
 
-🎯 体验LangGraph的强大功能
-🚀 从简单到复杂的演示示例
-⚡ 即时运行，无需配置
+    async def _prompt(self, prompt: str) -> str:
+        """在工作线程中读取输入，避免阻塞事件循环；被取消（Ctrl+C）时通知工作线程退出"""
+        cancelled = threading.Event()
+        try:
+            return await asyncio.to_thread(_read_line, prompt, cancelled)
+        finally:
+            cancelled.set()
 
-        """
-        print(banner)
+    async def _prewarm(self):
+        """后台预编译所有演示图，与等待用户输入的时间重叠"""
+        if not _LG_OK:
+            return
 
-    def display_menu(self) -> str:
-        """显示主菜单"""
-        print("请选择演示类别:")
-        print("0. 🏠 主菜单")
-        print("1. 🎯 基础演示")
-        print("2. 🚀 高级演示")
-        print("3. 🎲 随机演示")
-        print("q. 🚪 退出")
-        return input("\n请输入选择 (0-3, q): ").strip()
-
-    def display_demo_menu(self, category: str) -> str:
-        """显示演示菜单"""
-        demos = self.demos[category]
-        print(f"\n{demos['title']}")
-        print("=" * len(demos['title']))
-        print(f"{demos['description']}\n")
+        def build_all():
+            for _, _, demo in _ALL_DEMOS:
+                builder = getattr(self, f"_build_{demo['id']}_graph", None)
+                if builder is None:
+                    continue
+                try:
+                    self._get_graph(demo["id"], builder)
+                except Exception:
+                    pass  # 预热失败不影响使用，运行演示时会再次构建并报告错误
+
+        await asyncio.to_thread(build_all)
 
+    async def display_menu(self) -> str:
+        """显示主菜单"""
+        sys.stdout.write(self.MAIN_MENU)
+        sys.stdout.flush()
+        return (await self._prompt("\n请输入选择 (0-3, q): ")).strip()
+
+    @staticmethod
+    def _format_demo_menu(demos: Dict[str, Any]) -> str:
+        """生成演示菜单文本"""
+        lines = [
+            f"\n{demos['title']}",
+            "=" * len(demos['title']),
+            f"{demos['description']}\n",
+        ]
         for i, demo in enumerate(demos["demos"], 1):
-            print(f"{i}. {demo['title']}")
-            print(f"   {demo['description']}")
+            lines.append(f"{i}. {demo['title']}")
+            lines.append(f"   {demo['description']}")
+        lines.append("\n0. 🔙 返回主菜单")
+        lines.append("")
+        return "\n".join(lines)
 
-        print("\n0. 🔙 返回主菜单")
-        return input(f"请选择演示 (0-{len(demos['demos'])}): ").strip()
+    async def display_demo_menu(self, category: str) -> str:
+        """显示演示菜单"""
+        sys.stdout.write(self._menu_text[category])
+        sys.stdout.flush()
+        return (await self._prompt(f"请选择演示 (0-{len(self.demos[category]['demos'])}): ")).strip()
 
     async def run_demo(self, category: str, demo_index: int):
         """运行演示"""
@@ -130,29 +321,29 @@ class DemoRunner:
         print(f"📝 {demo['description']}")
         print()
 
+        # 等待后台预编译完成，避免与其重复构建同一个图
+        if self._prewarm_task is not None:
+            await self._prewarm_task
+
+        demo_function = self._dispatch.get(demo["id"])
+        if demo_function is None:
+            print(f"❌ 演示函数不存在: {demo['function']}")
+            return
+
         try:
-            # 动态调用演示函数
-            demo_function = getattr(self, demo["function"])
             await demo_function()
-        except AttributeError:
-            print(f"❌ 演示函数不存在: {demo['function']}")
         except Exception as e:
             print(f"❌ 演示运行失败: {e}")
 
-    async def demo_hello_world(self):
-        """Hello World演示"""
-        print("🎯 演示: 创建最简单的LangGraph应用")
+    def _get_graph(self, key: str, builder):
+        """获取已编译的图，首次使用时构建并缓存"""
+        compiled_graph = self._graph_cache.get(key)
+        if compiled_graph is None:
+            compiled_graph = self._graph_cache[key] = builder()
+        return compiled_graph
 
-        # 导入必要模块
-        try:
-            from langchain_core.messages import HumanMessage, AIMessage
-            from langgraph.graph import StateGraph
-            from typing import TypedDict, Annotated
-            import operator
-        except ImportError as e:
-            print(f"❌ 导入模块失败: {e}")
-            print("请确保已安装langgraph和langchain")
-            return
+    def _build_hello_world_graph(self):
+        """构建Hello World演示图"""
 
         class State(TypedDict):
             messages: Annotated[list, operator.add]
@@ -171,13 +362,24 @@ class DemoRunner:
 
             return {"messages": [AIMessage(content=response)]}
 
-        # 创建图
-        print("\n📝 创建LangGraph图...")
         graph = StateGraph(State)
         graph.add_node("chatbot", simple_chatbot)
         graph.set_entry_point("chatbot")
         graph.set_finish_point("chatbot")
-        compiled_graph = graph.compile()
+        return graph.compile()
+
+    async def demo_hello_world(self):
+        """Hello World演示"""
+        print("🎯 演示: 创建最简单的LangGraph应用")
+
+        if not _LG_OK:
+            print(f"❌ 导入模块失败: {_LG_ERR}")
+            print("请确保已安装langgraph和langchain")
+            return
+
+        # 创建图
+        print("\n📝 创建LangGraph图...")
+        compiled_graph = self._get_graph("hello_world", self._build_hello_world_graph)
 
         print("✅ 图创建完成!")
 
@@ -189,34 +391,25 @@ class DemoRunner:
             "演示结束"
         ]
 
-        for i, user_input in enumerate(test_inputs, 1):
-            print(f"\n--- 示例 {i} ---")
-            print(f"用户: {user_input}")
-
-            result = await compiled_graph.ainvoke({
-                "messages": [HumanMessage(content=user_input)]
-            })
+        # 各示例相互独立，一次批量执行
+        results = await compiled_graph.abatch([
+            {"messages": [HumanMessage(content=user_input)]}
+            for user_input in test_inputs
+        ])
 
+        for i, (user_input, result) in enumerate(zip(test_inputs, results), 1):
+            # 每个示例的输出拼接后一次写出
             ai_response = result["messages"][-1].content
-            print(f"助手: {ai_response}")
+            sys.stdout.write(f"\n--- 示例 {i} ---\n用户: {user_input}\n助手: {ai_response}\n")
 
             # 稍作停顿，便于观察
-            await asyncio.sleep(1)
+            if self.pace:
+                await asyncio.sleep(self.pace)
 
         print("\n✅ Hello World演示完成!")
 
-    async def demo_state_flow(self):
-        """状态流转演示"""
-        print("🎯 演示: 状态在工作流中的传递")
-
-        try:
-            from langchain_core.messages import HumanMessage, AIMessage
-            from langgraph.graph import StateGraph
-            from typing import TypedDict, Annotated
-            import operator
-        except ImportError as e:
-            print(f"❌ 导入模块失败: {e}")
-            return
+    def _build_state_flow_graph(self):
+        """构建状态流转演示图"""
 
         class ProcessState(TypedDict):
             input_text: str
@@ -226,10 +419,9 @@ class DemoRunner:
 
         def text_analyzer(state: ProcessState):
             """文本分析器"""
-            text = state["input_text"]
-            word_count = len(text.split())
+            processed_text, word_count = _analyze(state["input_text"])
             return {
-                "processed_text": text.upper(),
+                "processed_text": processed_text,
                 "word_count": word_count,
                 "step": "analysis_completed"
             }
@@ -243,8 +435,6 @@ class DemoRunner:
                 "step": "summary_completed"
             }
 
-        # 创建多步骤工作流
-        print("\n📝 创建多步骤工作流...")
         graph = StateGraph(ProcessState)
 
         graph.add_node("analyzer", text_analyzer)
@@ -254,7 +444,19 @@ class DemoRunner:
         graph.add_edge("analyzer", "summarizer")
         graph.set_finish_point("summarizer")
 
-        compiled_graph = graph.compile()
+        return graph.compile()
+
+    async def demo_state_flow(self):
+        """状态流转演示"""
+        print("🎯 演示: 状态在工作流中的传递")
+
+        if not _LG_OK:
+            print(f"❌ 导入模块失败: {_LG_ERR}")
+            return
+
+        # 创建多步骤工作流
+        print("\n📝 创建多步骤工作流...")
+        compiled_graph = self._get_graph("state_flow", self._build_state_flow_graph)
         print("✅ 多步骤图创建完成!")
 
         # 运行演示
@@ -270,26 +472,16 @@ class DemoRunner:
             "step": "start"
         })
 
-        print(f"\n处理结果:")
-        print(f"原文本: {result['input_text']}")
-        print(f"处理后: {result['processed_text']}")
-        print(f"词数统计: {result['word_count']}")
-        print(f"处理步骤: {result['step']}")
+        sys.stdout.write(
+            f"\n处理结果:\n原文本: {result['input_text']}\n"
+            f"处理后: {result['processed_text']}\n"
+            f"词数统计: {result['word_count']}\n处理步骤: {result['step']}\n"
+        )
 
         print("\n✅ 状态流转演示完成!")
 
-    async def demo_conditional_routing(self):
-        """条件路由演示"""
-        print("🎯 演示: 根据条件决定执行路径")
-
-        try:
-            from langchain_core.messages import HumanMessage, AIMessage
-            from langgraph.graph import StateGraph
-            from typing import TypedDict, Annotated, Literal
-            import operator
-        except ImportError as e:
-            print(f"❌ 导入模块失败: {e}")
-            return
+    def _build_conditional_routing_graph(self):
+        """构建条件路由演示图"""
 
         class RouterState(TypedDict):
             message: str
@@ -300,9 +492,9 @@ class DemoRunner:
             """消息分类器"""
             message = state["message"].lower()
 
-            if any(word in message for word in ["计算", "算", "数学"]):
+            if _MATH_RE.search(message):
                 category = "math"
-            elif any(word in message for word in ["翻译", "english", "英文"]):
+            elif _TRANS_RE.search(message):
                 category = "translation"
             else:
                 category = "general"
@@ -325,8 +517,6 @@ class DemoRunner:
             """路由决策函数"""
             return state["category"]
 
-        # 创建条件路由图
-        print("\n📝 创建条件路由图...")
         graph = StateGraph(RouterState)
 
         graph.add_node("classifier", classifier)
@@ -336,6 +526,7 @@ class DemoRunner:
 
         graph.set_entry_point("classifier")
 
+        # 这个演示的重点就是条件边：分类结果决定下一个执行的节点
         graph.add_conditional_edges(
             "classifier",
             route_decision,
@@ -350,7 +541,19 @@ class DemoRunner:
         graph.set_finish_point("translation_handler")
         graph.set_finish_point("general_handler")
 
-        compiled_graph = graph.compile()
+        return graph.compile()
+
+    async def demo_conditional_routing(self):
+        """条件路由演示"""
+        print("🎯 演示: 根据条件决定执行路径")
+
+        if not _LG_OK:
+            print(f"❌ 导入模块失败: {_LG_ERR}")
+            return
+
+        # 创建条件路由图
+        print("\n📝 创建条件路由图...")
+        compiled_graph = self._get_graph("conditional_routing", self._build_conditional_routing_graph)
         print("✅ 条件路由图创建完成!")
 
         # 运行演示
@@ -361,35 +564,24 @@ class DemoRunner:
             "你好，这是普通消息"
         ]
 
-        for i, message in enumerate(test_messages, 1):
-            print(f"\n--- 示例 {i} ---")
-            print(f"消息: {message}")
-
-            result = await compiled_graph.ainvoke({
-                "message": message,
-                "category": "",
-                "response": ""
-            })
+        # 各示例相互独立，一次批量执行
+        results = await compiled_graph.abatch([
+            {"message": message, "category": "", "response": ""}
+            for message in test_messages
+        ])
 
-            print(f"分类: {result['category']}")
-            print(f"响应: {result['response']}")
-            await asyncio.sleep(1)
+        for i, (message, result) in enumerate(zip(test_messages, results), 1):
+            sys.stdout.write(
+                f"\n--- 示例 {i} ---\n消息: {message}\n"
+                f"分类: {result['category']}\n响应: {result['response']}\n"
+            )
+            if self.pace:
+                await asyncio.sleep(self.pace)
 
         print("\n✅ 条件路由演示完成!")
 
-    async def demo_memory_persistence(self):
-        """持久化内存演示"""
-        print("🎯 演示: 保存和恢复对话状态")
-
-        try:
-            from langchain_core.messages import HumanMessage, AIMessage
-            from langgraph.graph import StateGraph
-            from langgraph.checkpoint.memory import MemorySaver
-            from typing import TypedDict, Annotated
-            import operator
-        except ImportError as e:
-            print(f"❌ 导入模块失败: {e}")
-            return
+    def _build_memory_persistence_graph(self):
+        """构建带内存检查点的演示图"""
 
         class ChatState(TypedDict):
             messages: Annotated[list, operator.add]
@@ -400,28 +592,38 @@ class DemoRunner:
             messages = state["messages"]
             count = state.get("conversation_count", 0) + 1
 
-            human_messages = [msg for msg in messages if isinstance(msg, HumanMessage)]
-            if human_messages:
-                last_message = human_messages[-1].content
-                response = f"这是我们的第{count}次对话。你说: {last_message}"
-            else:
+            # 从尾部查找最近一条用户消息，无需遍历整个历史
+            last_human = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+            last_message = last_human.content if last_human else None
+            if last_message is None:
                 response = "你好！让我们开始对话吧。"
+            else:
+                response = f"这是我们的第{count}次对话。你说: {last_message}"
 
             return {
                 "messages": [AIMessage(content=response)],
                 "conversation_count": count
             }
 
-        # 创建带内存的图
-        print("\n📝 创建带内存的工作流...")
         graph = StateGraph(ChatState)
         graph.add_node("chatbot", memory_chatbot)
         graph.set_entry_point("chatbot")
         graph.set_finish_point("chatbot")
 
-        # 添加内存检查点
-        memory = MemorySaver()
-        compiled_graph = graph.compile(checkpointer=memory)
+        # 添加内存检查点（使用模块级共享实例）
+        return graph.compile(checkpointer=_SHARED_MEMORY)
+
+    async def demo_memory_persistence(self):
+        """持久化内存演示"""
+        print("🎯 演示: 保存和恢复对话状态")
+
+        if not _LG_OK:
+            print(f"❌ 导入模块失败: {_LG_ERR}")
+            return
+
+        # 创建带内存的图
+        print("\n📝 创建带内存的工作流...")
+        compiled_graph = self._get_graph("memory_persistence", self._build_memory_persistence_graph)
         print("✅ 带内存的工作流创建完成!")
 
         # 运行演示
@@ -448,63 +650,60 @@ class DemoRunner:
 
         print("\n✅ 持久化内存演示完成!")
 
-    async def demo_tool_integration(self):
-        """工具集成演示"""
-        print("🎯 演示: 集成外部工具和API")
-
-        try:
-            from langchain_core.messages import HumanMessage, AIMessage
-            from langchain_core.tools import tool
-            from langgraph.graph import StateGraph
-            from langgraph.prebuilt import ToolNode
-            from typing import TypedDict, Annotated
-            import operator
-            import time
-        except ImportError as e:
-            print(f"❌ 导入模块失败: {e}")
-            return
+    def _build_tool_integration_graph(self):
+        """构建带工具的演示图"""
 
         # 定义工具
         @tool
         def get_current_time(query: str) -> str:
             """获取当前时间"""
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-            return f"当前时间是: {current_time}"
+            return f"当前时间是: {datetime.now().isoformat(sep=' ', timespec='seconds')}"
 
         @tool
         def calculator(expression: str) -> str:
             """简单计算器"""
             try:
-                # 安全的数学表达式计算
-                safe_expression = expression.replace('^', '**')
-                result = eval(safe_expression)
+                # 安全的数学表达式计算（仅允许算术运算）
+                result = _safe_eval(expression)
                 return f"计算结果: {result}"
-            except:
+            except Exception:
                 return "计算错误: 无效的数学表达式"
 
         class ToolState(TypedDict):
             messages: Annotated[list, operator.add]
 
+        def tool_call_for(text: str):
+            """根据消息内容选择工具调用，不需要工具时返回None"""
+            match = _TOOL_ROUTER.search(text)
+            if match is None:
+                return None
+            if match.lastgroup == "time":
+                return {"name": "get_current_time", "args": {"query": text}, "id": "call_time"}
+            expression = _NON_ARITH_RE.sub("", text).strip()
+            return {"name": "calculator", "args": {"expression": expression}, "id": "call_calc"}
+
         def should_use_tools(state: ToolState):
-            """判断是否需要使用工具"""
+            """判断是否需要使用工具：助手发出了工具调用则执行工具，否则结束"""
             messages = state["messages"]
-            last_message = messages[-1].content if messages else ""
-
-            if any(keyword in last_message.lower() for keyword in ["时间", "几点", "time"]):
-                return "tools"
-            elif any(keyword in last_message.lower() for keyword in ["计算", "算", "+", "-", "*", "/"]):
+            if messages and getattr(messages[-1], "tool_calls", None):
                 return "tools"
-            else:
-                return "assistant"
+            return END
 
         def assistant(state: ToolState):
             """助手响应"""
             messages = state["messages"]
-            last_message = messages[-1].content if messages else ""
+            last = messages[-1] if messages else None
+
+            # 工具已执行，直接返回工具结果
+            if isinstance(last, ToolMessage):
+                return {"messages": [AIMessage(content=last.content)]}
+
+            last_message = last.content if last is not None else ""
+            tool_call = tool_call_for(last_message)
+            if tool_call is not None:
+                return {"messages": [AIMessage(content="", tool_calls=[tool_call])]}
             return {"messages": [AIMessage(content=f"我收到你的消息: {last_message}")]}
 
-        # 创建带工具的图
-        print("\n📝 创建带工具的工作流...")
         tools = [get_current_time, calculator]
         tool_node = ToolNode(tools)
 
@@ -515,9 +714,20 @@ class DemoRunner:
         graph.set_entry_point("assistant")
         graph.add_conditional_edges("assistant", should_use_tools)
         graph.add_edge("tools", "assistant")
-        graph.set_finish_point("assistant")
 
-        compiled_graph = graph.compile()
+        return graph.compile()
+
+    async def demo_tool_integration(self):
+        """工具集成演示"""
+        print("🎯 演示: 集成外部工具和API")
+
+        if not _LG_OK:
+            print(f"❌ 导入模块失败: {_LG_ERR}")
+            return
+
+        # 创建带工具的图
+        print("\n📝 创建带工具的工作流...")
+        compiled_graph = self._get_graph("tool_integration", self._build_tool_integration_graph)
         print("✅ 带工具的工作流创建完成!")
 
         # 运行演示
@@ -528,85 +738,78 @@ class DemoRunner:
             "你好，这是普通消息"
         ]
 
-        for i, query in enumerate(test_queries, 1):
-            print(f"\n--- 示例 {i} ---")
-            print(f"用户: {query}")
-
-            result = await compiled_graph.ainvoke({
-                "messages": [HumanMessage(content=query)]
-            })
+        # 各示例相互独立，一次批量执行
+        results = await compiled_graph.abatch([
+            {"messages": [HumanMessage(content=query)]}
+            for query in test_queries
+        ])
 
+        for i, (query, result) in enumerate(zip(test_queries, results), 1):
             ai_response = result["messages"][-1].content
-            print(f"助手: {ai_response}")
-            await asyncio.sleep(1)
+            sys.stdout.write(f"\n--- 示例 {i} ---\n用户: {query}\n助手: {ai_response}\n")
+            if self.pace:
+                await asyncio.sleep(self.pace)
 
         print("\n✅ 工具集成演示完成!")
 
-    async def demo_error_handling(self):
-        """错误处理演示"""
-        print("🎯 演示: 优雅地处理错误和异常")
-
-        try:
-            from langchain_core.messages import HumanMessage, AIMessage
-            from langgraph.graph import StateGraph, END
-            from typing import TypedDict, Annotated, Literal
-            import operator
-        except ImportError as e:
-            print(f"❌ 导入模块失败: {e}")
-            return
+    def _build_error_handling_graph(self):
+        """构建带错误处理的演示图"""
 
         class ErrorState(TypedDict):
             messages: Annotated[list, operator.add]
             error_count: int
             processing_successful: bool
 
+        max_attempts = 3
+
         def safe_processor(state: ErrorState):
-            """安全的处理器（可能失败）"""
+            """安全的处理器（可能失败），在节点内部循环重试，无需重新调度图"""
             messages = state["messages"]
             last_message = messages[-1].content if messages else ""
 
             error_count = state.get("error_count", 0)
+            replies = []
+
+            for attempt in range(max_attempts):
+                # 模拟处理失败的情况
+                if "错误" not in last_message:
+                    replies.append(AIMessage(content=f"成功处理: {last_message}"))
+                    return {
+                        "error_count": 0,
+                        "processing_successful": True,
+                        "messages": replies
+                    }
+                if error_count >= max_attempts - 1:
+                    break
+                error_count += 1
+                replies.append(AIMessage(content="处理失败，正在重试..."))
 
-            # 模拟处理失败的情况
-            if "错误" in last_message and error_count < 2:
-                return {
-                    "error_count": error_count + 1,
-                    "processing_successful": False,
-                    "messages": [AIMessage(content="处理失败，正在重试...")]
-                }
-            elif "错误" in last_message and error_count >= 2:
-                return {
-                    "error_count": error_count,
-                    "processing_successful": False,
-                    "messages": [AIMessage(content="多次重试失败，放弃处理")]
-                }
-            else:
-                return {
-                    "error_count": 0,
-                    "processing_successful": True,
-                    "messages": [AIMessage(content=f"成功处理: {last_message}")]
-                }
-
-        def retry_logic(state: ErrorState) -> Literal["retry", "end"]:
-            """重试逻辑"""
-            if state.get("processing_successful", False):
-                return "end"
-            elif state.get("error_count", 0) < 2:
-                return "retry"
-            else:
-                return "end"
+            replies.append(AIMessage(content="多次重试失败，放弃处理"))
+            return {
+                "error_count": error_count,
+                "processing_successful": False,
+                "messages": replies
+            }
 
-        # 创建带错误处理的图
-        print("\n📝 创建带错误处理的工作流...")
         graph = StateGraph(ErrorState)
         graph.add_node("processor", safe_processor)
 
         graph.set_entry_point("processor")
-        graph.add_conditional_edges("processor", retry_logic)
-        graph.add_edge("processor", "processor")  # 重试边
         graph.set_finish_point("processor")
 
-        compiled_graph = graph.compile()
+        return graph.compile()
+
+    async def demo_error_handling(self):
+        """错误处理演示"""
+        print("🎯 演示: 优雅地处理错误和异常")
+
+        if not _LG_OK:
+            print(f"❌ 导入模块失败: {_LG_ERR}")
+            return
+
+        # 创建带错误处理的图
+        print("\n📝 创建带错误处理的工作流...")
+        compiled_graph = self._get_graph("error_handling", self._build_error_handling_graph)
         print("✅ 带错误处理的工作流创建完成!")
 
         # 运行演示
@@ -618,8 +821,7 @@ class DemoRunner:
         ]
 
         for i, user_input in enumerate(test_inputs, 1):
-            print(f"\n--- 示例 {i} ---")
-            print(f"输入: {user_input}")
+            sys.stdout.write(f"\n--- 示例 {i} ---\n输入: {user_input}\n")
 
             result = await compiled_graph.ainvoke({
                 "messages": [HumanMessage(content=user_input)],
@@ -628,33 +830,28 @@ class DemoRunner:
             })
 
             ai_response = result["messages"][-1].content
-            print(f"处理次数: {result.get('error_count', 0) + 1}")
-            print(f"响应: {ai_response}")
-            await asyncio.sleep(1)
+            sys.stdout.write(f"处理次数: {result.get('error_count', 0) + 1}\n响应: {ai_response}\n")
+            if self.pace:
+                await asyncio.sleep(self.pace)
 
         print("\n✅ 错误处理演示完成!")
 
-    def run_random_demo(self):
+    async def run_random_demo(self):
         """运行随机演示"""
         import random
 
-        all_demos = []
-        for category, category_data in self.demos.items():
-            for demo in category_data["demos"]:
-                all_demos.append((category, demo))
-
-        if all_demos:
-            category, demo = random.choice(all_demos)
-            print(f"\n🎲 随机选择: {demo['title']} ({category})")
-            return asyncio.run(self.run_demo(category, category_data["demos"].index(demo)))
+        category, index, demo = random.choice(_ALL_DEMOS)
+        print(f"\n🎲 随机选择: {demo['title']} ({category})")
+        await self.run_demo(category, index)
 
     async def run(self):
         """运行演示运行器"""
         self.print_banner()
+        self._prewarm_task = asyncio.create_task(self._prewarm())
 
         while True:
             try:
-                choice = self.display_menu()
+                choice = await self.display_menu()
 
                 if choice == "q":
                     print("\n👋 感谢使用LangGraph演示运行器!")
@@ -662,32 +859,90 @@ class DemoRunner:
                 elif choice == "0":
                     pass  # 显示主菜单
                 elif choice == "1":
-                    demo_choice = self.display_demo_menu("basic")
+                    demo_choice = await self.display_demo_menu("basic")
                     if demo_choice != "0":
                         await self.run_demo("basic", int(demo_choice) - 1)
                 elif choice == "2":
-                    demo_choice = self.display_demo_menu("advanced")
+                    demo_choice = await self.display_demo_menu("advanced")
                     if demo_choice != "0":
                         await self.run_demo("advanced", int(demo_choice) - 1)
                 elif choice == "3":
-                    self.run_random_demo()
+                    await self.run_random_demo()
                 else:
                     print("❌ 无效的选择，请重试")
 
                 if choice != "q":
-                    input("\n按回车键继续...")
+                    await self._prompt("\n按回车键继续...")
 
             except KeyboardInterrupt:
                 print("\n\n👋 再见!")
                 break
             except Exception as e:
                 print(f"\n❌ 发生错误: {e}")
-                input("按回车键继续...")
+                await self._prompt("按回车键继续...")
+
+    async def _run_captured(self, demo: Dict[str, Any]):
+        """在独立缓冲区中运行单个演示，返回其全部输出"""
+        buf = io.StringIO()
+        _demo_output.set(buf)  # 仅作用于当前任务的上下文副本
+        try:
+            await self._dispatch[demo["id"]]()
+        except Exception as e:
+            buf.write(f"❌ 演示运行失败: {e}\n")
+            return buf.getvalue(), False
+        return buf.getvalue(), True
+
+    async def run_smoke(self) -> int:
+        """冒烟模式：跳过菜单，并发运行所有演示，返回失败的演示数"""
+        demos = [demo for _, _, demo in _ALL_DEMOS]
+        start = time.perf_counter()
+
+        real_stdout = sys.stdout
+        sys.stdout = _DemoStdout(real_stdout)
+        try:
+            results = await asyncio.gather(*(self._run_captured(demo) for demo in demos))
+        finally:
+            sys.stdout = real_stdout
+
+        failed = 0
+        for demo, (output, ok) in zip(demos, results):
+            failed += not ok
+            sys.stdout.write(f"\n🎬 演示: {demo['title']}\n{'=' * 50}\n{output}")
+
+        elapsed = time.perf_counter() - start
+        print(f"\n📊 冒烟测试: {len(demos) - failed}/{len(demos)} 个演示成功，耗时 {elapsed:.2f}s")
+        return failed
+
+def run_async(coro):
+    """运行协程：已安装uvloop时使用uvloop事件循环，Python 3.12+启用eager任务工厂"""
+    if sys.version_info >= (3, 11):
+        loop_factory = uvloop.new_event_loop if uvloop is not None else None
+        with asyncio.Runner(loop_factory=loop_factory) as loop_runner:
+            if hasattr(asyncio, "eager_task_factory"):
+                # 同步完成的子协程直接内联执行，省去一次调度往返
+                loop_runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+            return loop_runner.run(coro)
+
+    if uvloop is not None:
+        uvloop.install()
+    return asyncio.run(coro)
 
 def main():
     """主函数"""
-    runner = DemoRunner()
-    asyncio.run(runner.run())
+    parser = argparse.ArgumentParser(description="LangGraph演示运行器")
+    parser.add_argument("--pace", type=float, default=0, metavar="SECS",
+                       help="示例之间的停顿秒数（默认0，不停顿）")
+    parser.add_argument("--smoke", action="store_true",
+                       help="跳过菜单，并发运行所有演示（用于CI/基准测试）")
+    args = parser.parse_args()
+
+    runner = DemoRunner(pace=args.pace)
+    if args.smoke:
+        sys.exit(1 if run_async(runner.run_smoke()) else 0)
+    try:
+        run_async(runner.run())
+    except KeyboardInterrupt:
+        print("\n\n👋 再见!")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
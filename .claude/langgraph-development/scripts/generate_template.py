@@ -9,8 +9,15 @@ LangGraph项目模板生成器
 import os
 import sys
 import argparse
+import io
+import tarfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from string import Template
+from typing import Dict, List, Union
 
 
 TEMPLATES = {
@@ -61,6 +68,10 @@ TEMPLATES = {
     }
 }
 
+# 模板列表是静态的，导入时生成一次列表文本
+_TEMPLATE_NAMES = tuple(TEMPLATES)
+_LISTING = "\n".join(f"{name:15} - {template['description']}" for name, template in TEMPLATES.items())
+
 
 TEMPLATE_CONTENTS = {
     "basic_agent_main.py": '''#!/usr/bin/env python3
@@ -128,6 +139,9 @@ if __name__ == "__main__":
 基础LangGraph代理实现
 """
 
+import ast
+import operator
+from functools import lru_cache
 from typing import Dict, List, Any
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.tools import tool
@@ -136,6 +150,53 @@ from langgraph.checkpoint.memory import MemorySaver
 from langchain_openai import ChatOpenAI
 
 
+# 乘方的指数与结果位数上限，防止 9**9**9**9 之类的表达式卡死进程
+_MAX_EXPONENT = 1000
+_MAX_POW_BITS = 4096
+
+
+def _safe_pow(base, exponent):
+    """计算乘方前先检查指数和结果大小"""
+    if abs(exponent) > _MAX_EXPONENT:
+        raise ValueError(f"指数过大（上限 {_MAX_EXPONENT}）")
+    if isinstance(base, int) and isinstance(exponent, int) and base.bit_length() * exponent > _MAX_POW_BITS:
+        raise ValueError("乘方结果过大")
+    return operator.pow(base, exponent)
+
+
+# 计算器允许的运算符
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _safe_pow,
+}
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def _eval_node(node):
+    """递归计算只包含数字和算术运算的语法树节点"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"不支持的表达式: {type(node).__name__}")
+
+
+@lru_cache(maxsize=256)
+def safe_eval(expression: str):
+    """安全地计算算术表达式（不使用eval），相同表达式直接命中缓存"""
+    return _eval_node(ast.parse(expression, mode="eval").body)
+
+
 class BasicAgent:
     """基础LangGraph代理"""
 
@@ -159,10 +220,10 @@ class BasicAgent:
     def calculator(self, expression: str) -> str:
         """简单计算器"""
         try:
-            # 注意：生产环境中使用更安全的计算方法
-            result = eval(expression)
+            # 只解析数字和算术运算，拒绝函数调用、名称访问等
+            result = safe_eval(expression)
             return f"计算结果: {result}"
-        except:
+        except Exception:
             return "计算错误，请检查表达式"
 
     def should_continue(self, state: Dict[str, Any]) -> str:
@@ -298,6 +359,7 @@ python src/main.py
 ## 项目结构
 
 ```
+$template_name/
 ├── src/
 │   ├── main.py          # 主程序入口
 │   ├── agent.py         # 代理实现
@@ -316,44 +378,174 @@ python src/main.py
 ## 注意事项
 
 - 确保有有效的OpenAI API密钥
-- 生产环境中应该使用更安全的计算方法
+- 计算器工具基于AST解析，只支持数字和算术运算（不使用eval）
 - 考虑添加错误处理和日志记录
 ''',
 }
 
+# 模板内容以压缩后的UTF-8字节常驻内存，仅在生成文件时按需解压（--list 等路径不解压）；
+# 内容完全相同的模板共用同一个压缩对象，只压缩、解压一次
+_COMPRESSED = {}
+for _content in TEMPLATE_CONTENTS.values():
+    if _content not in _COMPRESSED:
+        _COMPRESSED[_content] = zlib.compress(_content.encode('utf-8'), 9)
+TEMPLATE_CONTENTS = {key: _COMPRESSED[content] for key, content in TEMPLATE_CONTENTS.items()}
+del _COMPRESSED
+
+
+# 导入时校验模板表：预先展开每个模板的 (路径片段, 内容键) 列表（路径片段只拆分并驻留一次），
+# 缺少内容的文件移到 "_missing"，生成时的写入循环无需再逐个检查
+for _template in TEMPLATES.values():
+    _template["_files_tuple"] = tuple(
+        (tuple(sys.intern(part) for part in file_path.split('/')), template_key)
+        for file_path, template_key in _template["files"].items()
+        if template_key in TEMPLATE_CONTENTS
+    )
+    _template["_missing"] = tuple(
+        template_key for template_key in _template["files"].values()
+        if template_key not in TEMPLATE_CONTENTS
+    )
 
-def create_template(template_name: str, output_dir: Path):
-    """创建指定模板的项目"""
-    if template_name not in TEMPLATES:
-        print(f"[ERROR] 未知的模板: {template_name}")
-        print(f"[INFO] 可用模板: {', '.join(TEMPLATES.keys())}")
-        return False
 
-    template = TEMPLATES[template_name]
-    print(f"[INFO] 创建模板: {template['description']}")
+def _template_bytes(template_key: str) -> bytes:
+    """返回模板内容的UTF-8字节（首次访问时解压并缓存）"""
+    return _decompress(TEMPLATE_CONTENTS[template_key])
 
-    # 创建目标目录
-    template_dir = output_dir / template_name
-    template_dir.mkdir(parents=True, exist_ok=True)
 
-    # 创建文件
-    created_files = []
-    for file_path, template_key in template["files"].items:
-        full_path = template_dir / file_path
+@lru_cache(maxsize=None)
+def _decompress(compressed: bytes) -> bytes:
+    """按压缩数据缓存解压结果，共享内容的模板只解压一次"""
+    return zlib.decompress(compressed)
 
-        # 确保父目录存在
-        full_path.parent.mkdir(parents=True, exist_ok=True)
 
-        if template_key in TEMPLATE_CONTENTS:
-            content = TEMPLATE_CONTENTS[template_key]
-            full_path.write_text(content, encoding='utf-8')
-            created_files.append(str(full_path))
-        else:
-            print(f"[WARNING] 模板文件 {template_key} 不存在，跳过")
+@lru_cache(maxsize=None)
+def _compiled_template(template_key: str) -> Template:
+    """返回预编译的 string.Template（首次访问时解析并缓存）"""
+    return Template(_template_bytes(template_key).decode('utf-8'))
+
+
+def render_template(template_key: str, substitutions: Dict[str, str]) -> bytes:
+    """渲染模板内容：替换 $name 占位符（字面量 $ 需写作 $$），无占位符时直接返回缓存的字节"""
+    data = _template_bytes(template_key)
+    if b'$' not in data:
+        return data
+    return _compiled_template(template_key).safe_substitute(substitutions).encode('utf-8')
+
+
+def _write_file(item):
+    """直接通过文件描述符写入单个文件（绕过 io 缓冲层），返回其路径"""
+    full_path, data = item
+    fd = os.open(full_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return full_path
 
-    print(f"[SUCCESS] 模板创建完成，共创建 {len(created_files)} 个文件:")
-    for file_path in created_files:
-        print(f"  - {file_path}")
+
+def create_template(template_name: str, output_dir: Union[str, Path], archive: bool = False):
+    """创建指定模板的项目（模板名称由命令行参数 choices 预先校验）
+
+    archive 为 True 时不展开目录，而是在输出目录中生成单个 <模板名>.tar.gz 归档。
+    """
+    return _create_template(template_name, os.fspath(output_dir), archive)
+
+
+def _existing_sizes(directory: str) -> Dict[str, int]:
+    """一次 scandir 取得目录下已有文件的大小，目录不存在时返回空字典"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name: entry.stat().st_size for entry in entries if entry.is_file()}
+    except FileNotFoundError:
+        return {}
+
+
+def _read_file(full_path: str) -> bytes:
+    """读取已有文件的内容"""
+    with open(full_path, 'rb') as f:
+        return f.read()
+
+
+def _write_archive(archive_path: str, template_name: str, entries) -> List[str]:
+    """把 (相对路径, 内容) 列表写入单个 tar.gz 归档，返回归档内的文件名"""
+    names = []
+    mtime = time.time()
+    with tarfile.open(archive_path, "w:gz") as tar:
+        for relative_path, data in entries:
+            info = tarfile.TarInfo(f"{template_name}/{relative_path}")
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = mtime
+            tar.addfile(info, io.BytesIO(data))
+            names.append(info.name)
+    return names
+
+
+def _create_template(template_name: str, output_dir: str, archive: bool = False) -> bool:
+    """模板生成实现：每次调用都检查磁盘，内容未变的文件跳过写入"""
+    template = TEMPLATES[template_name]
+    print(f"[INFO] 创建模板: {template['description']}")
+
+    files = template["_files_tuple"]
+    for template_key in template["_missing"]:
+        print(f"[WARNING] 模板文件 {template_key} 不存在，跳过")
+
+    # 模板占位符的替换值，每次生成只构建一次
+    substitutions = {
+        "template_name": template_name,
+        "description": template["description"],
+    }
+
+    if archive:
+        # 整个项目写入一个归档文件，无需逐个创建目录和文件
+        os.makedirs(output_dir, exist_ok=True)
+        archive_path = os.path.normpath(os.path.join(output_dir, f"{template_name}.tar.gz"))
+        names = _write_archive(archive_path, template_name, [
+            ("/".join(parts), render_template(template_key, substitutions))
+            for parts, template_key in files
+        ])
+        sys.stdout.write("".join(
+            [f"[SUCCESS] 模板归档完成: {archive_path}，共打包 {len(names)} 个文件:\n"]
+            + [f"  - {name}\n" for name in names]
+        ))
+        return True
+
+    # 目标目录（随下面的父目录一并创建）；循环内使用 os.path 字符串操作
+    base = os.path.normpath(os.path.join(output_dir, template_name))
+
+    parents = {os.path.join(base, *parts[:-1]) for parts, _ in files}
+
+    # 重新生成时跳过内容未变的文件：每个目录只 scandir 一次取得文件大小，大小相同时再比较内容
+    existing = {parent: _existing_sizes(parent) for parent in parents}
+
+    # 先去重创建所有父目录，每个目录只创建一次
+    for parent in sorted(parents, key=len):
+        os.makedirs(parent, exist_ok=True)
+
+    # 收集待写入的文件
+    pending = []
+    unchanged = 0
+    for parts, template_key in files:
+        parent = os.path.join(base, *parts[:-1])
+        full_path = os.path.join(parent, parts[-1])
+        data = render_template(template_key, substitutions)
+        if existing[parent].get(parts[-1]) == len(data) and _read_file(full_path) == data:
+            unchanged += 1
+            continue
+        pending.append((full_path, data))
+
+    # 并发写入文件，重叠各文件的 open/write/close 系统调用
+    with ThreadPoolExecutor(max_workers=min(8, len(pending) or 1)) as executor:
+        created_files = list(executor.map(_write_file, pending))
+
+    # 文件列表拼接后一次写出
+    skipped = f"，{unchanged} 个文件内容未变已跳过" if unchanged else ""
+    sys.stdout.write("".join(
+        [f"[SUCCESS] 模板创建完成，共创建 {len(created_files)} 个文件{skipped}:\n"]
+        + [f"  - {file_path}\n" for file_path in created_files]
+    ))
 
     return True
 
@@ -362,8 +554,7 @@ def list_templates():
     """列出所有可用模板"""
     print("可用的LangGraph项目模板:")
     print("-" * 50)
-    for name, template in TEMPLATES.items():
-        print(f"{name:15} - {template['description']}")
+    print(_LISTING)
 
 
 def main():
@@ -372,6 +563,7 @@ def main():
     parser.add_argument(
         "template",
         nargs="?",
+        choices=_TEMPLATE_NAMES,
         help="模板名称（basic_agent, rag_system, multi_agent, production_ready）"
     )
     parser.add_argument(
@@ -380,6 +572,12 @@ def main():
         default=".",
         help="输出目录（默认为当前目录）"
     )
+    parser.add_argument(
+        "--archive",
+        "-a",
+        action="store_true",
+        help="生成单个 <模板名>.tar.gz 归档而不是展开的项目目录"
+    )
     parser.add_argument(
         "--list",
         "-l",
@@ -401,18 +599,24 @@ def main():
         return
 
     # 创建模板
-    output_dir = Path(args.output)
-    success = create_template(args.template, output_dir)
+    # 直接传入字符串路径，create_template 内部使用 os.path 处理
+    success = create_template(args.template, args.output, archive=args.archive)
 
     if success:
-        print("\\n" + "=" * 60)
-        print("[SUCCESS] 项目模板创建成功！")
-        print("=" * 60)
-        print(f"\\n下一步:")
-        print(f"1. cd {args.template}")
-        print(f"2. 编辑配置文件")
-        print(f"3. 安装依赖: pip install -r requirements.txt")
-        print(f"4. 运行项目: python src/main.py")
+        if args.archive:
+            first_step = f"tar -xzf {args.template}.tar.gz && cd {args.template}"
+        else:
+            first_step = f"cd {args.template}"
+        sys.stdout.write(
+            "\n" + "=" * 60 + "\n"
+            "[SUCCESS] 项目模板创建成功！\n"
+            + "=" * 60 + "\n"
+            "\n下一步:\n"
+            f"1. {first_step}\n"
+            "2. 编辑配置文件\n"
+            "3. 安装依赖: pip install -r requirements.txt\n"
+            "4. 运行项目: python src/main.py\n"
+        )
 
 
 if __name__ == "__main__":
@@ -7,132 +7,240 @@ LangGraph交互式教程启动器
 的核心概念和实际应用。
 """
 
+import itertools
 import os
 import sys
-import subprocess
-import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 import json
 
+# 教程配置（静态数据，导入时构建一次，所有实例共用）
+_TUTORIALS: Dict[str, Dict] = {
+    "basics": {
+        "title": "📖 LangGraph基础概念",
+        "description": "学习LangGraph的核心概念和基本用法",
+        "lessons": [
+            {
+                "id": "hello_world",
+                "title": "Hello World",
+                "description": "创建你的第一个LangGraph应用",
+                "file": "examples/hello_world.py",
+                "difficulty": "⭐",
+                "time": "10分钟"
+            },
+            {
+                "id": "state_management",
+                "title": "状态管理",
+                "description": "理解LangGraph中的状态传递机制",
+                "file": "examples/simple_chatbot.py",
+                "difficulty": "⭐⭐",
+                "time": "15分钟"
+            },
+            {
+                "id": "conditional_routing",
+                "title": "条件路由",
+                "description": "学习如何根据条件控制工作流",
+                "file": "examples/conditional_flow.py",
+                "difficulty": "⭐⭐",
+                "time": "20分钟"
+            }
+        ]
+    },
+    "intermediate": {
+        "title": "🚀 中级技能",
+        "description": "掌握更复杂的LangGraph模式和技术",
+        "lessons": [
+            {
+                "id": "memory_persistence",
+                "title": "持久化内存",
+                "description": "使用检查点保存和恢复状态",
+                "file": "notebooks/03_memory_persistence.ipynb",
+                "difficulty": "⭐⭐⭐",
+                "time": "25分钟"
+            },
+            {
+                "id": "tool_integration",
+                "title": "工具集成",
+                "description": "集成外部工具和API",
+                "file": "notebooks/04_tools_and_agents.ipynb",
+                "difficulty": "⭐⭐⭐",
+                "time": "30分钟"
+            },
+            {
+                "id": "error_handling",
+                "title": "错误处理",
+                "description": "构建健壮的LangGraph应用",
+                "file": "notebooks/05_error_handling.ipynb",
+                "difficulty": "⭐⭐⭐",
+                "time": "25分钟"
+            }
+        ]
+    },
+    "advanced": {
+        "title": "💡 高级应用",
+        "description": "探索企业级的LangGraph架构模式",
+        "lessons": [
+            {
+                "id": "multi_agent",
+                "title": "多代理系统",
+                "description": "构建协作的多代理应用",
+                "file": "notebooks/06_multi_agent_systems.ipynb",
+                "difficulty": "⭐⭐⭐⭐",
+                "time": "40分钟"
+            },
+            {
+                "id": "human_in_loop",
+                "title": "人机协作",
+                "description": "在循环中集成人类决策",
+                "file": "notebooks/07_human_in_loop.ipynb",
+                "difficulty": "⭐⭐⭐⭐",
+                "time": "35分钟"
+            },
+            {
+                "id": "production_deployment",
+                "title": "生产部署",
+                "description": "将LangGraph应用部署到生产环境",
+                "file": "notebooks/08_production_deployment.ipynb",
+                "difficulty": "⭐⭐⭐⭐⭐",
+                "time": "45分钟"
+            }
+        ]
+    }
+}
+
+
+# 由静态教程配置派生的常量：按目录顺序排列的 (模块标题, 课程)，以及课程总数
+_LESSON_ORDER: Tuple[Tuple[str, Dict], ...] = tuple(
+    (module["title"], lesson)
+    for module in _TUTORIALS.values()
+    for lesson in module["lessons"]
+)
+_TOTAL_LESSONS = len(_LESSON_ORDER)
+
+
+# 主菜单和设置菜单是静态文本，导入时拼接一次
+_MAIN_MENU_TEXT = "\n".join([
+    "\n" + "=" * 60,
+    "请选择学习模块:",
+    "0. 🏠 查看学习进度",
+    "1. 📖 LangGraph基础概念",
+    "2. 🚀 中级技能",
+    "3. 💡 高级应用",
+    "4. 🎯 快速挑战",
+    "5. 🛠️ 实践项目",
+    "6. ⚙️ 系统设置",
+    "q. 🚪 退出",
+    "",
+])
+
+_SETTINGS_MENU_TEXT = "\n".join([
+    "\n⚙️ 系统设置",
+    "=" * 40,
+    "1. 🗑️  清除学习进度",
+    "2. 📊 导出学习报告",
+    "3. 🔧 检查环境",
+    "0. 🔙 返回主菜单",
+    "",
+])
+
+
+# 挑战标题转文件名：空格换成下划线并去掉表情符号（含变体选择符 U+FE0F），一次 translate 完成
+_TITLE_SANITIZER = str.maketrans({" ": "_", "🧮": "", "🌤": "", "\ufe0f": "", "🤖": ""})
+
+
+# 已在 quick_start.py 中创建的课程，只需提示文件已存在
+_LESSON_FIXED_MSG: Dict[str, str] = {
+    "hello_world": "✅ Hello World课程文件已存在",
+    "state_management": "✅ 状态管理课程文件已存在",
+    "conditional_routing": "✅ 条件路由课程文件已存在",
+}
+
+# notebook 占位符中固定不变的元数据和外壳，只有 markdown 单元格的内容随课程变化
+_NOTEBOOK_METADATA = {
+    "kernelspec": {
+        "display_name": "Python 3",
+        "language": "python",
+        "name": "python3"
+    },
+    "language_info": {
+        "codemirror_mode": {
+            "name": "ipython",
+            "version": 3
+        },
+        "file_extension": ".py",
+        "mimetype": "text/x-python",
+        "name": "python",
+        "nbconvert_exporter": "python",
+        "pygments_lexer": "ipython3",
+        "version": "3.9.0"
+    }
+}
+_NOTEBOOK_SHELL_TEMPLATE = {
+    "cells": [],
+    "metadata": _NOTEBOOK_METADATA,
+    "nbformat": 4,
+    "nbformat_minor": 4
+}
+
+
 class InteractiveTutorial:
     """交互式教程管理器"""
 
     def __init__(self):
         self.project_root = Path(__file__).parent.parent
-        self.tutorials = self._load_tutorials()
+        self.tutorials = _TUTORIALS
         self.progress_file = self.project_root / "tutorial_progress.json"
-
-    def _load_tutorials(self) -> Dict:
-        """加载教程配置"""
-        return {
-            "basics": {
-                "title": "📖 LangGraph基础概念",
-                "description": "学习LangGraph的核心概念和基本用法",
-                "lessons": [
-                    {
-                        "id": "hello_world",
-                        "title": "Hello World",
-                        "description": "创建你的第一个LangGraph应用",
-                        "file": "examples/hello_world.py",
-                        "difficulty": "⭐",
-                        "time": "10分钟"
-                    },
-                    {
-                        "id": "state_management",
-                        "title": "状态管理",
-                        "description": "理解LangGraph中的状态传递机制",
-                        "file": "examples/simple_chatbot.py",
-                        "difficulty": "⭐⭐",
-                        "time": "15分钟"
-                    },
-                    {
-                        "id": "conditional_routing",
-                        "title": "条件路由",
-                        "description": "学习如何根据条件控制工作流",
-                        "file": "examples/conditional_flow.py",
-                        "difficulty": "⭐⭐",
-                        "time": "20分钟"
-                    }
-                ]
-            },
-            "intermediate": {
-                "title": "🚀 中级技能",
-                "description": "掌握更复杂的LangGraph模式和技术",
-                "lessons": [
-                    {
-                        "id": "memory_persistence",
-                        "title": "持久化内存",
-                        "description": "使用检查点保存和恢复状态",
-                        "file": "notebooks/03_memory_persistence.ipynb",
-                        "difficulty": "⭐⭐⭐",
-                        "time": "25分钟"
-                    },
-                    {
-                        "id": "tool_integration",
-                        "title": "工具集成",
-                        "description": "集成外部工具和API",
-                        "file": "notebooks/04_tools_and_agents.ipynb",
-                        "difficulty": "⭐⭐⭐",
-                        "time": "30分钟"
-                    },
-                    {
-                        "id": "error_handling",
-                        "title": "错误处理",
-                        "description": "构建健壮的LangGraph应用",
-                        "file": "notebooks/05_error_handling.ipynb",
-                        "difficulty": "⭐⭐⭐",
-                        "time": "25分钟"
-                    }
-                ]
-            },
-            "advanced": {
-                "title": "💡 高级应用",
-                "description": "探索企业级的LangGraph架构模式",
-                "lessons": [
-                    {
-                        "id": "multi_agent",
-                        "title": "多代理系统",
-                        "description": "构建协作的多代理应用",
-                        "file": "notebooks/06_multi_agent_systems.ipynb",
-                        "difficulty": "⭐⭐⭐⭐",
-                        "time": "40分钟"
-                    },
-                    {
-                        "id": "human_in_loop",
-                        "title": "人机协作",
-                        "description": "在循环中集成人类决策",
-                        "file": "notebooks/07_human_in_loop.ipynb",
-                        "difficulty": "⭐⭐⭐⭐",
-                        "time": "35分钟"
-                    },
-                    {
-                        "id": "production_deployment",
-                        "title": "生产部署",
-                        "description": "将LangGraph应用部署到生产环境",
-                        "file": "notebooks/08_production_deployment.ipynb",
-                        "difficulty": "⭐⭐⭐⭐⭐",
-                        "time": "45分钟"
-                    }
-                ]
-            }
+        # 进度只在启动时读取一次，之后以内存中的副本为准，保存时同步更新
+        self._progress = self._read_progress_from_disk()
+        # 本次会话中已确认存在的课程文件
+        self._existing_lessons: Set[Path] = set()
+        # 本次会话中已创建/确认存在的目录
+        self._ensured_dirs: Set[Path] = set()
+        # 主菜单选项 -> 处理函数
+        self._menu_actions = {
+            "0": self.display_progress,
+            "1": lambda: self._run_module("basics"),
+            "2": lambda: self._run_module("intermediate"),
+            "3": lambda: self._run_module("advanced"),
+            "4": self.quick_challenge,
+            "5": self.practice_projects,
+            "6": self.system_settings,
         }
 
+    def _ensure_dir(self, path: Path):
+        """确保目录存在，同一目录在一次会话中只调用一次 mkdir"""
+        if path in self._ensured_dirs:
+            return
+        path.mkdir(parents=True, exist_ok=True)
+        self._ensured_dirs.add(path)
+
     def load_progress(self) -> Dict:
-        """加载学习进度"""
-        if self.progress_file.exists():
-            try:
-                with open(self.progress_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {"completed_lessons": [], "current_lesson": None, "start_time": None}
+        """加载学习进度（返回内存中缓存的进度）"""
+        return self._progress
+
+    def _read_progress_from_disk(self) -> Dict:
+        """从进度文件读取学习进度（直接尝试打开，文件不存在或损坏时返回初始进度）"""
+        try:
+            with open(self.progress_file, 'r', encoding='utf-8') as f:
+                progress = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            progress = {"completed_lessons": [], "current_lesson": None, "start_time": None}
+        # 内存中以有序字典的键保存已完成课程：O(1) 判断是否完成，同时保留完成顺序
+        progress["completed_lessons"] = dict.fromkeys(progress.get("completed_lessons", []))
+        return progress
 
     def save_progress(self, progress: Dict):
         """保存学习进度"""
+        self._progress = progress
         try:
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(progress, f, indent=2, ensure_ascii=False)
+            # 先写入同目录下的临时文件再原子替换，写入中途中断也不会损坏原进度文件
+            tmp_file = self.progress_file.with_suffix('.json.tmp')
+            serializable = {**progress, "completed_lessons": list(progress.get("completed_lessons", []))}
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(serializable, f, ensure_ascii=False, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.progress_file)
         except Exception as e:
             print(f"保存进度失败: {e}")
 
@@ -155,17 +263,7 @@ class InteractiveTutorial:
         progress = self.load_progress()
         completed_count = len(progress.get("completed_lessons", []))
 
-        print(f"\n📊 学习进度: {completed_count} 个课程已完成")
-        print("\n" + "="*60)
-        print("请选择学习模块:")
-        print("0. 🏠 查看学习进度")
-        print("1. 📖 LangGraph基础概念")
-        print("2. 🚀 中级技能")
-        print("3. 💡 高级应用")
-        print("4. 🎯 快速挑战")
-        print("5. 🛠️ 实践项目")
-        print("6. ⚙️ 系统设置")
-        print("q. 🚪 退出")
+        sys.stdout.write(f"\n📊 学习进度: {completed_count} 个课程已完成\n" + _MAIN_MENU_TEXT)
 
         return input("\n请输入选择 (0-6, q): ").strip()
 
@@ -175,18 +273,19 @@ class InteractiveTutorial:
         progress = self.load_progress()
         completed = progress.get("completed_lessons", [])
 
-        print(f"\n{module['title']}")
-        print("=" * len(module['title']))
-        print(f"{module['description']}\n")
-
+        lines = [
+            f"\n{module['title']}",
+            "=" * len(module['title']),
+            f"{module['description']}\n",
+        ]
         for i, lesson in enumerate(module["lessons"], 1):
             status = "✅" if lesson["id"] in completed else "⭕"
-            print(f"{i}. {status} {lesson['title']} ({lesson['difficulty']})")
-            print(f"   {lesson['description']}")
-            print(f"   ⏱️  {lesson['time']}")
-            print()
-
-        print("0. 🔙 返回主菜单")
+            lines.append(f"{i}. {status} {lesson['title']} ({lesson['difficulty']})")
+            lines.append(f"   {lesson['description']}")
+            lines.append(f"   ⏱️  {lesson['time']}")
+            lines.append("")
+        lines.append("0. 🔙 返回主菜单")
+        sys.stdout.write("\n".join(lines) + "\n")
         return input("请选择课程 (0-{}): ".format(len(module["lessons"]))).strip()
 
     def run_lesson(self, module_key: str, lesson_index: int):
@@ -208,110 +307,80 @@ class InteractiveTutorial:
         print(f"⭐ 难度: {lesson['difficulty']}")
         print(f"⏱️  预计时间: {lesson['time']}")
 
-        if not lesson_file.exists():
-            print(f"❌ 文件不存在: {lesson_file}")
-            print("正在创建文件...")
-            self.create_missing_lesson(lesson)
-            return
+        # 已确认存在的课程文件在本次会话中不再重复检查
+        if lesson_file not in self._existing_lessons:
+            if not lesson_file.exists():
+                print(f"❌ 文件不存在: {lesson_file}")
+                print("正在创建文件...")
+                self.create_missing_lesson(lesson)
+                return
+            self._existing_lessons.add(lesson_file)
 
         # 根据文件类型选择运行方式
-        if lesson_file.suffix == '.py':
+        suffix = lesson_file.suffix
+        if suffix == '.py':
             self.run_python_lesson(lesson_file, lesson)
-        elif lesson_file.suffix == '.ipynb':
+        elif suffix == '.ipynb':
             self.run_jupyter_lesson(lesson_file, lesson)
         else:
-            print(f"❌ 不支持的文件类型: {lesson_file.suffix}")
+            print(f"❌ 不支持的文件类型: {suffix}")
 
         # 更新进度
         self.mark_lesson_completed(lesson["id"])
 
     def create_missing_lesson(self, lesson: Dict):
         """创建缺失的课程文件"""
-        if lesson["id"] == "hello_world":
-            # 已在quick_start.py中创建
-            print("✅ Hello World课程文件已存在")
-        elif lesson["id"] == "state_management":
-            # 已在quick_start.py中创建
-            print("✅ 状态管理课程文件已存在")
-        elif lesson["id"] == "conditional_routing":
-            # 已在quick_start.py中创建
-            print("✅ 条件路由课程文件已存在")
+        message = _LESSON_FIXED_MSG.get(lesson["id"])
+        if message:
+            print(message)
         else:
             # 创建Jupyter notebook占位符
             self.create_notebook_placeholder(lesson)
 
     def create_notebook_placeholder(self, lesson: Dict):
         """创建Jupyter notebook占位符"""
-        notebook_dir = self.project_root / "notebooks"
-        notebook_dir.mkdir(exist_ok=True)
-
+        source = [
+            f"# {lesson['title']}\n\n",
+            f"{lesson['description']}\n\n",
+            f"**难度**: {lesson['difficulty']}\n\n",
+            f"**预计时间**: {lesson['time']}\n\n",
+            "---\n\n",
+            "## 课程内容\n\n",
+            "### 学习目标\n\n",
+            "通过本课程，你将学习到:\n\n",
+            "- [目标1]\n",
+            "- [目标2]\n",
+            "- [目标3]\n\n",
+            "### 实践练习\n\n",
+            "下面让我们开始实践...\n\n",
+            "```python\n",
+            "# 在这里编写你的代码\n",
+            "```\n\n",
+            "### 总结\n\n",
+            "完成本课程后，你应该能够:\n\n",
+            "- [技能1]\n",
+            "- [技能2]\n"
+        ]
         notebook_content = {
-            "cells": [
-                {
-                    "cell_type": "markdown",
-                    "metadata": {},
-                    "source": [
-                        f"# {lesson['title']}\n\n",
-                        f"{lesson['description']}\n\n",
-                        f"**难度**: {lesson['difficulty']}\n\n",
-                        f"**预计时间**: {lesson['time']}\n\n",
-                        "---\n\n",
-                        "## 课程内容\n\n",
-                        "### 学习目标\n\n",
-                        "通过本课程，你将学习到:\n\n",
-                        "- [目标1]\n",
-                        "- [目标2]\n",
-                        "- [目标3]\n\n",
-                        "### 实践练习\n\n",
-                        "下面让我们开始实践...\n\n",
-                        "```python\n",
-                        "# 在这里编写你的代码\n",
-                        "```\n\n",
-                        "### 总结\n\n",
-                        "完成本课程后，你应该能够:\n\n",
-                        "- [技能1]\n",
-                        "- [技能2]\n"
-                    ]
-                }
-            ],
-            "metadata": {
-                "kernelspec": {
-                    "display_name": "Python 3",
-                    "language": "python",
-                    "name": "python3"
-                },
-                "language_info": {
-                    "codemirror_mode": {
-                        "name": "ipython",
-                        "version": 3
-                    },
-                    "file_extension": ".py",
-                    "mimetype": "text/x-python",
-                    "name": "python",
-                    "nbconvert_exporter": "python",
-                    "pygments_lexer": "ipython3",
-                    "version": "3.9.0"
-                }
-            },
-            "nbformat": 4,
-            "nbformat_minor": 4
+            **_NOTEBOOK_SHELL_TEMPLATE,
+            "cells": [{"cell_type": "markdown", "metadata": {}, "source": source}],
         }
 
+        # 只创建一次 notebook 所在目录（即 notebooks/）
         notebook_file = self.project_root / lesson["file"]
-        notebook_file.parent.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(notebook_file.parent)
 
         try:
-            import json
             with open(notebook_file, 'w', encoding='utf-8') as f:
                 json.dump(notebook_content, f, indent=2)
             print(f"✅ 创建了Jupyter notebook: {notebook_file}")
-        except ImportError:
-            print("❌ 需要安装json库来创建notebook")
         except Exception as e:
             print(f"❌ 创建notebook失败: {e}")
 
     def run_python_lesson(self, file_path: Path, lesson: Dict):
         """运行Python课程"""
+        import subprocess  # 延迟导入：只有真正运行外部程序时才需要
+
         print(f"\n🚀 运行Python课程: {file_path}")
         print("-" * 40)
 
@@ -321,19 +390,16 @@ class InteractiveTutorial:
 
             if choice in ['y', 'yes', '是']:
                 print("🏃‍♂️ 执行中...")
-                result = subprocess.run([sys.executable, str(file_path)],
-                                      capture_output=True, text=True, timeout=60)
+                print("输出:")
+                # 子进程直接继承终端的 stdout/stderr，输出实时显示而不在内存中缓冲；
+                # 先刷新自己的缓冲区，避免提示信息排在子进程输出之后
+                sys.stdout.flush()
+                result = subprocess.run([sys.executable, str(file_path)], timeout=60)
 
                 if result.returncode == 0:
                     print("✅ 执行成功!")
-                    if result.stdout:
-                        print("输出:")
-                        print(result.stdout)
                 else:
-                    print("❌ 执行失败:")
-                    if result.stderr:
-                        print("错误信息:")
-                        print(result.stderr)
+                    print(f"❌ 执行失败 (退出码: {result.returncode})")
 
             # 询问是否要查看代码
             choice = input("是否查看课程代码? (y/n): ").strip().lower()
@@ -342,15 +408,20 @@ class InteractiveTutorial:
                 print("=" * 40)
                 try:
                     with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        # 限制显示行数
-                        lines = content.split('\n')
-                        if len(lines) > 50:
-                            print("(显示前50行)")
-                            print('\n'.join(lines[:50]))
-                            print(f"...(还有{len(lines)-50}行)")
-                        else:
-                            print(content)
+                        # 限制显示行数：只把前51行读进内存，其余行逐行计数
+                        head = list(itertools.islice(f, 51))
+                        last_line = head[-1] if head else ""
+                        rest = 0
+                        for last_line in f:
+                            rest += 1
+                    # 与按 '\n' 切分的计数保持一致：末尾换行后的空串也算一行
+                    total = len(head) + rest + (not head or last_line.endswith('\n'))
+                    if total > 50:
+                        print("(显示前50行)")
+                        sys.stdout.write(''.join(head[:50]))
+                        print(f"...(还有{total-50}行)")
+                    else:
+                        sys.stdout.write(''.join(head) + '\n')
                 except Exception as e:
                     print(f"读取文件失败: {e}")
 
@@ -361,6 +432,8 @@ class InteractiveTutorial:
 
     def run_jupyter_lesson(self, file_path: Path, lesson: Dict):
         """运行Jupyter课程"""
+        import subprocess  # 延迟导入：只有真正运行外部程序时才需要
+
         print(f"\n📓 Jupyter Notebook课程: {file_path}")
 
         try:
@@ -380,8 +453,9 @@ class InteractiveTutorial:
     def mark_lesson_completed(self, lesson_id: str):
         """标记课程为已完成"""
         progress = self.load_progress()
-        if lesson_id not in progress.get("completed_lessons", []):
-            progress["completed_lessons"].append(lesson_id)
+        completed = progress["completed_lessons"]
+        if lesson_id not in completed:
+            completed[lesson_id] = None
             self.save_progress(progress)
             print("✅ 课程已完成，进度已保存!")
 
@@ -389,42 +463,41 @@ class InteractiveTutorial:
         """显示学习进度"""
         progress = self.load_progress()
         completed = progress.get("completed_lessons", [])
-        total_lessons = sum(len(module["lessons"]) for module in self.tutorials.values())
+        total_lessons = _TOTAL_LESSONS
 
-        print("\n📊 学习进度报告")
-        print("=" * 50)
-        print(f"已完成课程: {len(completed)}/{total_lessons}")
+        lines = [
+            "\n📊 学习进度报告",
+            "=" * 50,
+            f"已完成课程: {len(completed)}/{total_lessons}",
+        ]
 
         if total_lessons > 0:
             percentage = (len(completed) / total_lessons) * 100
-            print(f"完成百分比: {percentage:.1f}%")
+            lines.append(f"完成百分比: {percentage:.1f}%")
 
             # 显示进度条
             bar_length = 30
             filled_length = int(bar_length * percentage / 100)
             bar = "█" * filled_length + "░" * (bar_length - filled_length)
-            print(f"进度条: [{bar}]")
+            lines.append(f"进度条: [{bar}]")
 
-        print("\n📋 已完成课程:")
+        lines.append("\n📋 已完成课程:")
         if completed:
-            for lesson_id in completed:
-                print(f"✅ {lesson_id}")
+            lines.extend(f"✅ {lesson_id}" for lesson_id in completed)
         else:
-            print("   还没有完成任何课程")
+            lines.append("   还没有完成任何课程")
 
-        print("\n🎯 建议下一步:")
+        lines.append("\n🎯 建议下一步:")
         if not completed:
-            print("   建议从 '📖 LangGraph基础概念' 开始学习")
+            lines.append("   建议从 '📖 LangGraph基础概念' 开始学习")
         else:
-            # 找到下一个未完成的课程
-            for module_key, module in self.tutorials.items():
-                for lesson in module["lessons"]:
-                    if lesson["id"] not in completed:
-                        print(f"   建议学习: {lesson['title']} ({module['title']})")
-                        break
-                else:
-                    continue
-                break
+            # 按目录顺序找到下一个未完成的课程（completed 是有序字典，成员判断为 O(1)）
+            next_lesson = next((ml for ml in _LESSON_ORDER if ml[1]["id"] not in completed), None)
+            if next_lesson:
+                module_title, lesson = next_lesson
+                lines.append(f"   建议学习: {lesson['title']} ({module_title})")
+
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def quick_challenge(self):
         """快速挑战"""
@@ -449,16 +522,13 @@ class InteractiveTutorial:
             }
         ]
 
-        print("\n🎯 快速挑战")
-        print("=" * 40)
-        print("选择一个挑战来测试你的技能:")
-
+        lines = ["\n🎯 快速挑战", "=" * 40, "选择一个挑战来测试你的技能:"]
         for i, challenge in enumerate(challenges, 1):
-            print(f"\n{i}. {challenge['title']} ({challenge['difficulty']})")
-            print(f"   {challenge['description']}")
-            print(f"   💡 提示: {challenge['hint']}")
-
-        print("\n0. 🔙 返回主菜单")
+            lines.append(f"\n{i}. {challenge['title']} ({challenge['difficulty']})")
+            lines.append(f"   {challenge['description']}")
+            lines.append(f"   💡 提示: {challenge['hint']}")
+        lines.append("\n0. 🔙 返回主菜单")
+        sys.stdout.write("\n".join(lines) + "\n")
 
         choice = input("选择挑战 (0-{}): ".format(len(challenges))).strip()
 
@@ -475,6 +545,8 @@ class InteractiveTutorial:
 
     def run_challenge(self, challenge: Dict):
         """运行挑战"""
+        import subprocess  # 延迟导入：只有真正运行外部程序时才需要
+
         print(f"\n🎯 挑战: {challenge['title']}")
         print("=" * 50)
         print(f"📝 描述: {challenge['description']}")
@@ -482,9 +554,9 @@ class InteractiveTutorial:
 
         # 创建挑战目录
         challenge_dir = self.project_root / "challenges"
-        challenge_dir.mkdir(exist_ok=True)
+        self._ensure_dir(challenge_dir)
 
-        challenge_file = challenge_dir / f"{challenge['title'].replace(' ', '_').replace('🧮', '').replace('🌤️', '').replace('🤖', '')}.py"
+        challenge_file = challenge_dir / f"{challenge['title'].translate(_TITLE_SANITIZER)}.py"
 
         choice = input("\n是否要开始编写挑战代码? (y/n): ").strip().lower()
         if choice in ['y', 'yes', '是']:
@@ -522,16 +594,13 @@ class InteractiveTutorial:
             }
         ]
 
-        print("\n🛠️ 实践项目")
-        print("=" * 40)
-        print("通过完整的项目实践你的技能:")
-
+        lines = ["\n🛠️ 实践项目", "=" * 40, "通过完整的项目实践你的技能:"]
         for i, project in enumerate(projects, 1):
-            print(f"\n{i}. {project['title']} ({project['difficulty']})")
-            print(f"   {project['description']}")
-            print(f"   🛠️  技能: {', '.join(project['skills'])}")
-
-        print("\n0. 🔙 返回主菜单")
+            lines.append(f"\n{i}. {project['title']} ({project['difficulty']})")
+            lines.append(f"   {project['description']}")
+            lines.append(f"   🛠️  技能: {', '.join(project['skills'])}")
+        lines.append("\n0. 🔙 返回主菜单")
+        sys.stdout.write("\n".join(lines) + "\n")
 
         choice = input("选择项目 (0-{}): ".format(len(projects))).strip()
 
@@ -548,13 +617,15 @@ class InteractiveTutorial:
 
     def start_project(self, project: Dict):
         """开始项目"""
+        import subprocess  # 延迟导入：只有真正运行外部程序时才需要
+
         print(f"\n🛠️ 项目: {project['title']}")
         print("=" * 50)
         print(f"📝 描述: {project['description']}")
         print(f"🛠️  涉及技能: {', '.join(project['skills'])}")
 
         project_dir = self.project_root / "projects" / project['title'].replace(' ', '_')
-        project_dir.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(project_dir)
 
         print(f"\n📁 项目目录: {project_dir}")
         print("🚀 项目已初始化，开始你的实践吧!")
@@ -572,12 +643,7 @@ class InteractiveTutorial:
 
     def system_settings(self):
         """系统设置"""
-        print("\n⚙️ 系统设置")
-        print("=" * 40)
-        print("1. 🗑️  清除学习进度")
-        print("2. 📊 导出学习报告")
-        print("3. 🔧 检查环境")
-        print("0. 🔙 返回主菜单")
+        sys.stdout.write(_SETTINGS_MENU_TEXT)
 
         choice = input("选择设置 (0-3): ").strip()
 
@@ -585,6 +651,7 @@ class InteractiveTutorial:
             if input("确定要清除所有学习进度吗? (y/n): ").strip().lower() in ['y', 'yes']:
                 if self.progress_file.exists():
                     self.progress_file.unlink()
+                self._progress = self._read_progress_from_disk()
                 print("✅ 学习进度已清除")
         elif choice == "2":
             self.export_progress_report()
@@ -593,6 +660,8 @@ class InteractiveTutorial:
 
     def export_progress_report(self):
         """导出学习进度报告"""
+        import time
+
         progress = self.load_progress()
         report_file = self.project_root / "learning_report.md"
 
@@ -629,6 +698,12 @@ class InteractiveTutorial:
             except ImportError:
                 print(f"❌ {dep} 未安装")
 
+    def _run_module(self, module_key: str):
+        """显示模块菜单并运行选中的课程"""
+        module_choice = self.display_module_menu(module_key)
+        if module_choice != "0":
+            self.run_lesson(module_key, int(module_choice) - 1)
+
     def run(self):
         """运行交互式教程"""
         self.display_welcome()
@@ -640,31 +715,14 @@ class InteractiveTutorial:
                 if choice == "q":
                     print("\n👋 感谢使用LangGraph交互式教程!")
                     break
-                elif choice == "0":
-                    self.display_progress()
-                elif choice == "1":
-                    module_choice = self.display_module_menu("basics")
-                    if module_choice != "0":
-                        self.run_lesson("basics", int(module_choice) - 1)
-                elif choice == "2":
-                    module_choice = self.display_module_menu("intermediate")
-                    if module_choice != "0":
-                        self.run_lesson("intermediate", int(module_choice) - 1)
-                elif choice == "3":
-                    module_choice = self.display_module_menu("advanced")
-                    if module_choice != "0":
-                        self.run_lesson("advanced", int(module_choice) - 1)
-                elif choice == "4":
-                    self.quick_challenge()
-                elif choice == "5":
-                    self.practice_projects()
-                elif choice == "6":
-                    self.system_settings()
+
+                action = self._menu_actions.get(choice)
+                if action:
+                    action()
                 else:
                     print("❌ 无效的选择，请重试")
 
-                if choice != "q":
-                    input("\n按回车键继续...")
+                input("\n按回车键继续...")
 
             except KeyboardInterrupt:
                 print("\n\n👋 再见!")
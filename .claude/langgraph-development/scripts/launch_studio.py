@@ -6,14 +6,59 @@ LangGraph学习工作室启动器
 一个统一的入口，提供多种学习和开发工具
 """
 
+import hashlib
+import importlib.util
+import json
 import os
+import re
+import runpy
 import sys
 import time
 import subprocess
+import traceback
 import webbrowser
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import argparse
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# 依赖检查结果缓存：同一解释器、site-packages 未变化且未过期时直接复用
+_DEPS_CACHE_FILE = Path.home() / ".cache" / "langgraph-studio" / "deps.json"
+_DEPS_CACHE_TTL = 3600
+
+# 示例文件开头的第一个三引号文档字符串
+_DOCSTRING_RE = re.compile(r'"""(.*?)"""', re.DOTALL)
+
+
+def _run_script_main(script_path: str, cwd: str) -> int:
+    """以 __main__ 身份运行脚本并返回退出码
+
+    模拟 `python script.py` 的运行环境（argv、工作目录和 sys.path[0]），结束后恢复。
+    定义在模块级，既可在当前进程中调用，也可以提交给进程池。
+    """
+    saved_argv, saved_cwd, saved_path = sys.argv, os.getcwd(), sys.path[:]
+    sys.argv = [script_path]
+    sys.path.insert(0, os.path.dirname(script_path))
+    os.chdir(cwd)
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
+        os.chdir(saved_cwd)
+        sys.stdout.flush()
+    return 0
 
 class LangGraphStudio:
     """LangGraph学习工作室"""
@@ -21,6 +66,11 @@ class LangGraphStudio:
     def __init__(self):
         self.project_root = Path(__file__).parent.parent
         self.tools = self._setup_tools()
+        # 运行隔离脚本的常驻工作进程池，第一次运行隔离脚本时才创建
+        self._isolated_pool: Optional[ProcessPoolExecutor] = None
+        # 示例列表缓存：examples 目录的 mtime 不变（没有增删文件）时直接复用
+        self._examples_cache: Optional[List[Tuple[Path, str]]] = None
+        self._examples_mtime = 0.0
 
     def _setup_tools(self) -> Dict:
         """设置可用的工具"""
@@ -35,7 +85,9 @@ class LangGraphStudio:
                 "title": "🎓 交互式教程",
                 "description": "循序渐进的学习系统，包含完整课程",
                 "script": "interactive_tutorial.py",
-                "category": "learning"
+                "category": "learning",
+                # 不修改进程级状态，可直接在工作室进程中运行
+                "in_process": True
             },
             "demo_runner": {
                 "title": "🎬 演示运行器",
@@ -59,7 +111,10 @@ class LangGraphStudio:
                 "title": "📊 性能监控",
                 "description": "实时监控LangGraph应用性能",
                 "script": "performance_monitor.py",
-                "category": "tools"
+                "category": "tools",
+                # 后台采样线程和 Prometheus 服务不能留在工作室进程中，
+                # 不需要终端输入，在常驻工作进程中运行以省去解释器启动
+                "pool": True
             },
             "checkpoint_analyzer": {
                 "title": "🔍 检查点分析",
@@ -149,7 +204,9 @@ class LangGraphStudio:
 
         try:
             if tool_info["script"]:
-                self.run_script(tool_info["script"])
+                self.run_script(tool_info["script"],
+                                in_process=tool_info.get("in_process", False),
+                                pool=tool_info.get("pool", False))
             else:
                 self.run_builtin_tool(tool_id)
 
@@ -158,8 +215,14 @@ class LangGraphStudio:
         except Exception as e:
             print(f"\n❌ 工具运行失败: {e}")
 
-    def run_script(self, script_name: str):
-        """运行Python脚本"""
+    def run_script(self, script_name: str, in_process: bool = False, pool: bool = False):
+        """运行Python脚本
+
+        脚本默认在新的子进程中运行，避免其全局状态影响工作室进程；
+        明确标记为无副作用的脚本（in_process 为 True）在当前解释器中运行，
+        省去启动新解释器和重复导入依赖的开销；不读取终端输入的长时间运行脚本
+        （pool 为 True）在常驻的工作进程中运行。
+        """
         script_path = self.project_root / "scripts" / script_name
 
         if not script_path.exists():
@@ -171,11 +234,14 @@ class LangGraphStudio:
 
         try:
             # 运行脚本
-            result = subprocess.run([sys.executable, str(script_path)],
-                                  cwd=self.project_root,
-                                  check=False)
+            if in_process:
+                returncode = self._run_in_process(script_path)
+            elif pool:
+                returncode = self._run_in_pool(script_path)
+            else:
+                returncode = self._run_subprocess(script_path)
 
-            if result.returncode == 0:
+            if returncode == 0:
                 print("✅ 脚本执行完成")
             else:
                 print("⚠️ 脚本执行时出现错误")
@@ -183,6 +249,44 @@ class LangGraphStudio:
         except Exception as e:
             print(f"❌ 脚本执行失败: {e}")
 
+    def _run_in_process(self, script_path: Path) -> int:
+        """在当前解释器中以 __main__ 身份运行脚本，返回与子进程一致的退出码"""
+        return _run_script_main(str(script_path), str(self.project_root))
+
+    def _start_isolated_pool(self):
+        """按需创建运行隔离脚本的进程池，之后的隔离脚本复用同一个工作进程"""
+        if self._isolated_pool is not None:
+            return
+        self._isolated_pool = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        atexit.register(self._isolated_pool.shutdown)
+
+    def _run_in_pool(self, script_path: Path) -> int:
+        """在常驻的工作进程中运行脚本（首次使用时创建进程池）"""
+        self._start_isolated_pool()
+        # 工作进程与当前进程共用终端，先输出已缓冲的提示信息
+        sys.stdout.flush()
+        args = (_run_script_main, str(script_path), str(self.project_root))
+        try:
+            future = self._isolated_pool.submit(*args)
+        except BrokenProcessPool:
+            # 工作进程在空闲时已退出（例如之前被 Ctrl+C 中断），重建进程池后重试
+            self._isolated_pool = None
+            self._start_isolated_pool()
+            future = self._isolated_pool.submit(*args)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # 脚本运行中工作进程意外退出，下次使用时重建进程池
+            self._isolated_pool = None
+            return 1
+
+    def _run_subprocess(self, script_path: Path) -> int:
+        """在新的子进程中运行脚本"""
+        return subprocess.run([sys.executable, str(script_path)],
+                              cwd=self.project_root,
+                              check=False).returncode
+
     def run_builtin_tool(self, tool_id: str):
         """运行内置工具"""
         if tool_id == "jupyter_lab":
@@ -230,38 +334,15 @@ class LangGraphStudio:
         print("📚 LangGraph示例代码:")
         print("=" * 40)
 
-        examples = list(examples_dir.glob("*.py"))
-        if not examples:
+        example_entries = self._load_examples(examples_dir)
+        if not example_entries:
             print("暂无示例文件")
             return
 
-        for i, example_file in enumerate(examples, 1):
+        examples = [example_file for example_file, _ in example_entries]
+        for i, (example_file, summary) in enumerate(example_entries, 1):
             print(f"\n{i}. 📄 {example_file.name}")
-
-            # 读取文件的前几行作为描述
-            try:
-                with open(example_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-
-                # 查找描述注释
-                description = ""
-                for line in lines[:20]:
-                    if '"""' in line:
-                        desc_lines = []
-                        for j in range(lines.index(line) + 1, len(lines)):
-                            if '"""' in lines[j]:
-                                break
-                            desc_lines.append(lines[j].strip().lstrip('# '))
-                        description = " ".join(desc_lines)
-                        break
-
-                if description:
-                    print(f"   📝 {description}")
-                else:
-                    print(f"   📁 大小: {example_file.stat().st_size} bytes")
-
-            except Exception as e:
-                print(f"   ⚠️ 读取失败: {e}")
+            print(f"   {summary}")
 
         print(f"\n📂 示例目录: {examples_dir}")
 
@@ -275,6 +356,38 @@ class LangGraphStudio:
         except (ValueError, KeyboardInterrupt):
             pass
 
+    def _load_examples(self, examples_dir: Path) -> List[Tuple[Path, str]]:
+        """扫描示例目录，返回 (示例文件, 描述行) 列表；目录未变化时使用缓存"""
+        mtime = examples_dir.stat().st_mtime
+        if self._examples_cache is not None and mtime == self._examples_mtime:
+            return self._examples_cache
+
+        entries = [(example_file, self._describe_example(example_file))
+                   for example_file in examples_dir.glob("*.py")]
+        self._examples_cache = entries
+        self._examples_mtime = mtime
+        return entries
+
+    def _describe_example(self, example_file: Path) -> str:
+        """读取文件的前几行作为描述，没有描述时显示文件大小"""
+        try:
+            # 描述只会出现在文件开头，读取前4096个字符就足够
+            with open(example_file, 'r', encoding='utf-8', errors='replace') as f:
+                head = f.read(4096)
+
+            match = _DOCSTRING_RE.search(head)
+            description = ""
+            if match:
+                description = " ".join(filter(None, (line.strip().lstrip('# ')
+                                                     for line in match.group(1).splitlines())))
+
+            if description:
+                return f"📝 {description}"
+            return f"📁 大小: {example_file.stat().st_size} bytes"
+
+        except Exception as e:
+            return f"⚠️ 读取失败: {e}"
+
     def run_example(self, example_file: Path):
         """运行示例文件"""
         print(f"\n🚀 运行示例: {example_file.name}")
@@ -356,20 +469,20 @@ class LangGraphStudio:
         else:
             print("❌ Python版本过低，需要 >= 3.9")
 
-        # 关键依赖
+        # 关键依赖（模块名, 说明）
         dependencies = [
             ("langgraph", "LangGraph核心库"),
             ("langchain", "LangChain库"),
             ("jupyter", "Jupyter Notebook"),
             ("rich", "Rich终端库"),
-            ("python-dotenv", "环境变量管理")
+            ("dotenv", "环境变量管理")  # python-dotenv 的模块名
         ]
 
+        installed = self._check_dependencies([package for package, _ in dependencies])
         for package, description in dependencies:
-            try:
-                __import__(package.replace('-', '_'))
+            if installed[package]:
                 print(f"✅ {description}")
-            except ImportError:
+            else:
                 print(f"❌ {description} (未安装)")
 
         # 项目结构
@@ -388,6 +501,38 @@ class LangGraphStudio:
         else:
             print("⚠️ .env 环境文件不存在")
 
+    def _check_dependencies(self, packages: List[str]) -> Dict[str, bool]:
+        """返回各依赖是否已安装，优先使用缓存的检查结果"""
+        # 解释器本身或任一 sys.path 目录（安装/卸载包会改变 site-packages 的 mtime）
+        # 发生变化时缓存即失效
+        key_parts = [sys.executable, str(os.path.getmtime(sys.executable))]
+        for entry in sys.path:
+            if os.path.isdir(entry):
+                key_parts.append(f"{entry}:{os.path.getmtime(entry)}")
+        cache_key = hashlib.sha1("\n".join(key_parts).encode("utf-8")).hexdigest()
+
+        try:
+            with open(_DEPS_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if (cache["key"] == cache_key
+                    and time.time() - cache["time"] < _DEPS_CACHE_TTL
+                    and set(packages) <= cache["installed"].keys()):
+                return cache["installed"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+        # find_spec 只查找模块位置而不执行模块代码，也不会把依赖加载进当前进程
+        installed = {package: importlib.util.find_spec(package) is not None
+                     for package in packages}
+
+        try:
+            _DEPS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(_DEPS_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({"key": cache_key, "time": time.time(), "installed": installed}, f)
+        except OSError:
+            pass
+        return installed
+
     def run(self, auto_tool: Optional[str] = None):
         """运行工作室"""
         self.print_banner()
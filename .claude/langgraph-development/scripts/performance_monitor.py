@@ -8,17 +8,29 @@ LangGraph性能监控工具
 """
 
 import asyncio
+import heapq
+import math
+import operator
+import os
 import time
 import json
 import sys
-import psutil
 import threading
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Callable
+from typing import Deque, Dict, List, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, asdict
 import argparse
 
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    # Linux 上直接读取 /proc，psutil 只在其他平台上需要
+    psutil = None
+
 try:
     import prometheus_client as prometheus
     from prometheus_client import Counter, Histogram, Gauge, start_http_server
@@ -34,10 +46,33 @@ except ImportError:
     print("[ERROR] 缺少LangGraph依赖")
     sys.exit(1)
 
+# 响应时间直方图：按 log1p(毫秒) 对数分桶，1毫秒以上相对误差约 0.25%，
+# 记录 O(1)、求分位数只需遍历固定数量的桶，内存不随执行次数增长
+_HDR_BUCKETS = 4096
+_HDR_SCALE = 200
+
 
-@dataclass
+def _hdr_bucket(seconds: float) -> int:
+    """执行时间（秒）-> 直方图桶下标"""
+    return min(_HDR_BUCKETS - 1, int(math.log1p(max(seconds, 0.0) * 1000) * _HDR_SCALE))
+
+
+def _hdr_value(bucket: int) -> float:
+    """直方图桶下标 -> 桶中点对应的执行时间（秒）"""
+    return math.expm1((bucket + 0.5) / _HDR_SCALE) / 1000
+
+
+@dataclass(frozen=True)
 class PerformanceMetrics:
-    """性能指标数据类"""
+    """性能指标数据类
+
+    每秒都会产生一条记录，使用 __slots__ 去掉每个实例的 __dict__ 以减少内存占用
+    （dataclass(slots=True) 需要 Python 3.10，这里手动声明以兼容 3.9）。
+    """
+    __slots__ = ('timestamp', 'cpu_usage', 'memory_usage', 'memory_mb', 'execution_time',
+                 'nodes_executed', 'tools_called', 'errors_count', 'throughput',
+                 'response_time_p95', 'response_time_p99')
+
     timestamp: datetime
     cpu_usage: float
     memory_usage: float
@@ -51,20 +86,69 @@ class PerformanceMetrics:
     response_time_p99: float
 
 
+# 时间窗口一律用单调时钟的纳秒整数比较，只在需要展示/导出时才转换成 datetime
+_NS_PER_SECOND = 1_000_000_000
+_THROUGHPUT_WINDOW_NS = 60 * _NS_PER_SECOND
+
+# 指标历史按列存储（每个字段一个 NumPy 数组），报告中的聚合是整列的向量化运算。
+# 名称: (存储类型, 缩放系数)。百分比和内存按定点整数存储以减少内存占用：
+# 写入时乘以缩放系数取整，读取时再除回来；缩放系数为 None 的列原样存储
+_METRIC_COLUMNS = {
+    "cpu_usage": (np.uint16, 100),      # 0.01% 精度
+    "memory_usage": (np.uint16, 100),   # 0.01% 精度
+    "memory_mb": (np.uint32, 1024),     # 以 KB 为单位，与 /proc/meminfo 一致
+    "execution_time": (np.float64, None),
+    "nodes_executed": (np.int64, None),
+    "tools_called": (np.int64, None),
+    "errors_count": (np.int64, None),
+    "throughput": (np.float64, None),
+    "response_time_p95": (np.float64, None),
+    "response_time_p99": (np.float64, None),
+}
+# 定点列可表示的取值范围：写入前先截断，避免负值或超大值溢出（NumPy 2 抛出
+# OverflowError，NumPy 1 则静默回绕）
+_FIXED_POINT_LIMITS = {
+    name: (int(np.iinfo(dtype).min), int(np.iinfo(dtype).max))
+    for name, (dtype, scale) in _METRIC_COLUMNS.items() if scale
+}
+
+
 class PerformanceMonitor:
     """LangGraph性能监控器"""
 
     def __init__(self, enable_prometheus: bool = False, prometheus_port: int = 8000):
-        self.metrics_history: List[PerformanceMetrics] = []
+        # 指标历史：列式环形缓冲区，启动监控时按采样间隔分配最近1小时的容量；
+        # _head 是下一次写入的位置，_size 是已保存的采样数；
+        # _ts 保存 time.monotonic_ns() 采样时间，加上 _wall_offset_ns 即为墙上时间
+        self._capacity = 0
+        self._head = 0
+        self._size = 0
+        self._ts = np.zeros(0, dtype=np.int64)
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+        self._cols = {name: np.zeros(0, dtype=dtype) for name, (dtype, _) in _METRIC_COLUMNS.items()}
+        self._latest: Optional[PerformanceMetrics] = None
         self.monitoring = False
         self.callbacks: List[Callable] = []
 
         # 性能统计
-        self.execution_times: List[float] = []
+        self._execution_starts: Dict[str, Dict[str, Any]] = {}
+        # 分位数由直方图计算；原始执行时间只保留最近1000条，用于导出
+        self._execution_hist = [0] * _HDR_BUCKETS
+        self._execution_total = 0
+        self.execution_times: Deque[float] = deque(maxlen=1000)
         self.node_execution_counts: Dict[str, int] = {}
         self.tool_call_counts: Dict[str, int] = {}
         self.error_counts: Dict[str, int] = {}
 
+        # 系统指标来源：Linux 上 /proc/stat 和 /proc/meminfo 只打开一次，
+        # 每次采样用 pread 从头读取少量字节，避免 psutil 每次采样的额外开销
+        self._stat_fd: Optional[int] = None
+        self._meminfo_fd: Optional[int] = None
+        self._prev_cpu_idle = 0
+        self._prev_cpu_total = 0
+        if sys.platform.startswith("linux"):
+            self._open_proc_files()
+
         # Prometheus指标
         self.enable_prometheus = enable_prometheus and PROMETHEUS_AVAILABLE
         if self.enable_prometheus:
@@ -115,6 +199,8 @@ class PerformanceMonitor:
             return
 
         self.monitoring = True
+        # 环形缓冲区只保留最近1小时的采样，写满后覆盖最旧的数据
+        self._allocate_history(int(3600 / interval) + 1)
         self.monitor_thread = threading.Thread(
             target=self._monitor_loop,
             args=(interval,),
@@ -130,84 +216,213 @@ class PerformanceMonitor:
             self.monitor_thread.join(timeout=5)
         print("[INFO] 性能监控已停止")
 
+    def _open_proc_files(self):
+        """打开 /proc 统计文件，失败时退回 psutil"""
+        try:
+            self._stat_fd = os.open("/proc/stat", os.O_RDONLY)
+            self._meminfo_fd = os.open("/proc/meminfo", os.O_RDONLY)
+            # 记录初始 CPU 时间，第一次采样即可得到有效的差值
+            self._prev_cpu_idle, self._prev_cpu_total = self._read_cpu_times()
+        except (OSError, ValueError, IndexError):
+            for fd in (self._stat_fd, self._meminfo_fd):
+                if fd is not None:
+                    os.close(fd)
+            self._stat_fd = self._meminfo_fd = None
+
+    def _read_cpu_times(self) -> Tuple[int, int]:
+        """读取 /proc/stat 汇总行，返回 (空闲时间, 总时间)，单位为 jiffies"""
+        cpu_line = os.pread(self._stat_fd, 512, 0).split(b"\n", 1)[0]
+        # cpu user nice system idle iowait irq softirq steal [guest guest_nice]
+        # guest 时间已经计入 user，不能重复累加
+        times = [int(field) for field in cpu_line.split()[1:9]]
+        return times[3] + times[4], sum(times)
+
+    def _read_system_usage(self) -> Tuple[float, float, float]:
+        """采集系统资源使用情况，返回 (CPU使用率, 内存使用率, 已用内存MB)"""
+        if self._stat_fd is None:
+            if psutil is None:
+                raise RuntimeError("缺少psutil依赖，无法在当前平台采集系统指标")
+            memory_info = psutil.virtual_memory()
+            return psutil.cpu_percent(), memory_info.percent, memory_info.used / 1024 / 1024
+
+        # CPU 使用率：两次采样之间非空闲时间所占的比例
+        idle, total = self._read_cpu_times()
+        idle_delta = idle - self._prev_cpu_idle
+        total_delta = total - self._prev_cpu_total
+        self._prev_cpu_idle, self._prev_cpu_total = idle, total
+        cpu_percent = round((1 - idle_delta / total_delta) * 100, 1) if total_delta > 0 else 0.0
+
+        # 内存使用率：与 psutil 相同，按 (MemTotal - MemAvailable) / MemTotal 计算
+        mem_total = mem_available = 0
+        for line in os.pread(self._meminfo_fd, 512, 0).splitlines():
+            if line.startswith(b"MemTotal:"):
+                mem_total = int(line.split()[1])
+            elif line.startswith(b"MemAvailable:"):
+                mem_available = int(line.split()[1])
+                break
+        used_kb = mem_total - mem_available
+        memory_percent = round(used_kb / mem_total * 100, 1) if mem_total else 0.0
+        return cpu_percent, memory_percent, used_kb / 1024
+
     def _monitor_loop(self, interval: float):
-        """监控循环"""
+        """监控循环（在后台线程中运行）"""
         while self.monitoring:
-            try:
-                # 收集系统指标
-                cpu_percent = psutil.cpu_percent()
-                memory_info = psutil.virtual_memory()
-
-                # 计算性能指标
-                metrics = PerformanceMetrics(
-                    timestamp=datetime.now(),
-                    cpu_usage=cpu_percent,
-                    memory_usage=memory_info.percent,
-                    memory_mb=memory_info.used / 1024 / 1024,
-                    execution_time=0.0,
-                    nodes_executed=sum(self.node_execution_counts.values()),
-                    tools_called=sum(self.tool_call_counts.values()),
-                    errors_count=sum(self.error_counts.values()),
-                    throughput=self._calculate_throughput(),
-                    response_time_p95=self._calculate_percentile(95),
-                    response_time_p99=self._calculate_percentile(99)
-                )
-
-                # 更新Prometheus指标
-                if self.enable_prometheus:
-                    self.cpu_usage_gauge.set(cpu_percent)
-                    self.memory_usage_gauge.set(memory_info.percent)
-
-                # 存储指标历史
-                self.metrics_history.append(metrics)
-
-                # 限制历史数据量（保留最近1小时）
-                cutoff_time = datetime.now() - timedelta(hours=1)
-                self.metrics_history = [
-                    m for m in self.metrics_history
-                    if m.timestamp > cutoff_time
-                ]
-
-                # 调用回调函数
-                for callback in self.callbacks:
-                    try:
-                        callback(metrics)
-                    except Exception as e:
-                        print(f"[WARNING] 回调函数执行失败: {e}")
+            self._sample_once()
+            time.sleep(interval)
 
-            except Exception as e:
-                print(f"[ERROR] 监控数据收集失败: {e}")
+    def _sample_once(self):
+        """采集一次性能指标"""
+        try:
+            # 收集系统指标
+            now_ns = time.monotonic_ns()
+            cpu_percent, memory_percent, memory_mb = self._read_system_usage()
+
+            # 计算性能指标
+            p95, p99 = self._calculate_percentiles(95, 99)
+            metrics = PerformanceMetrics(
+                timestamp=self._to_datetime(now_ns),
+                cpu_usage=cpu_percent,
+                memory_usage=memory_percent,
+                memory_mb=memory_mb,
+                execution_time=0.0,
+                nodes_executed=sum(self.node_execution_counts.values()),
+                tools_called=sum(self.tool_call_counts.values()),
+                errors_count=sum(self.error_counts.values()),
+                throughput=self._calculate_throughput(),
+                response_time_p95=p95,
+                response_time_p99=p99
+            )
 
-            time.sleep(interval)
+            # 更新Prometheus指标
+            if self.enable_prometheus:
+                self.cpu_usage_gauge.set(cpu_percent)
+                self.memory_usage_gauge.set(memory_percent)
+
+            # 存储指标历史
+            self._append_metrics(metrics, now_ns)
+
+            # 调用回调函数
+            for callback in self.callbacks:
+                try:
+                    callback(metrics)
+                except Exception as e:
+                    print(f"[WARNING] 回调函数执行失败: {e}")
+
+        except Exception as e:
+            print(f"[ERROR] 监控数据收集失败: {e}")
 
     def _calculate_throughput(self) -> float:
         """计算吞吐量（每秒执行的节点数）"""
-        if not self.metrics_history:
-            return 0.0
-
         # 计算最近1分钟的吞吐量
-        cutoff_time = datetime.now() - timedelta(minutes=1)
-        recent_metrics = [
-            m for m in self.metrics_history
-            if m.timestamp > cutoff_time
-        ]
+        recent = self._recent_indices(_THROUGHPUT_WINDOW_NS)
 
-        if len(recent_metrics) < 2:
+        if len(recent) < 2:
             return 0.0
 
-        total_nodes = recent_metrics[-1].nodes_executed - recent_metrics[0].nodes_executed
-        time_span = (recent_metrics[-1].timestamp - recent_metrics[0].timestamp).total_seconds()
+        first, last = recent[0], recent[-1]
+        nodes = self._cols["nodes_executed"]
+        total_nodes = int(nodes[last] - nodes[first])
+        time_span = int(self._ts[last] - self._ts[first]) / _NS_PER_SECOND
 
         return total_nodes / time_span if time_span > 0 else 0.0
 
+    def _allocate_history(self, capacity: int):
+        """按容量重新分配指标缓冲区，保留已有采样中最新的部分"""
+        keep = self._ordered_indices()[-capacity:]
+        self._ts = np.concatenate([self._ts[keep], np.zeros(capacity - len(keep), dtype=self._ts.dtype)])
+        self._cols = {
+            name: np.concatenate([column[keep], np.zeros(capacity - len(keep), dtype=column.dtype)])
+            for name, column in self._cols.items()
+        }
+        self._capacity = capacity
+        self._size = len(keep)
+        self._head = self._size % capacity
+
+    def _to_datetime(self, monotonic_ns: int) -> datetime:
+        """单调时钟纳秒 -> 本地时间"""
+        return datetime.fromtimestamp((monotonic_ns + self._wall_offset_ns) / _NS_PER_SECOND)
+
+    def _append_metrics(self, metrics: PerformanceMetrics, monotonic_ns: int):
+        """把一次采样写入环形缓冲区"""
+        head = self._head
+        self._ts[head] = monotonic_ns
+        for name, column in self._cols.items():
+            scale = _METRIC_COLUMNS[name][1]
+            value = getattr(metrics, name)
+            if scale:
+                low, high = _FIXED_POINT_LIMITS[name]
+                value = min(max(round(value * scale), low), high)
+            column[head] = value
+        self._head = (head + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+        self._latest = metrics
+
+    def _column(self, name: str, indices: np.ndarray) -> np.ndarray:
+        """取出指定下标的指标值，定点存储的列换算回原始单位"""
+        values = self._cols[name][indices]
+        scale = _METRIC_COLUMNS[name][1]
+        return values / scale if scale else values
+
+    def _ordered_indices(self) -> np.ndarray:
+        """按时间顺序返回所有已保存采样在缓冲区中的下标"""
+        start = self._head - self._size
+        return (np.arange(start, self._head)) % max(self._capacity, 1)
+
+    def _recent_indices(self, window_ns: int) -> np.ndarray:
+        """按时间顺序返回最近 window_ns 纳秒内采样的下标"""
+        if not self._size:
+            return np.zeros(0, dtype=np.intp)
+        cutoff_ns = time.monotonic_ns() - window_ns
+        # 缓冲区由两段各自有序的区间组成：[_head, _size) 较旧，[0, _head) 较新
+        # （未写满时前者为空），分别二分查找截止时间即可得到窗口内的采样数
+        head, size, ts = self._head, self._size, self._ts
+        count = (head - int(np.searchsorted(ts[:head], cutoff_ns, side="right"))
+                 + size - head - int(np.searchsorted(ts[head:size], cutoff_ns, side="right")))
+        # 采样按时间顺序写入，窗口内的采样恰好是最新的 count 条
+        return self._ordered_indices()[size - count:]
+
+    def history_records(self) -> List[PerformanceMetrics]:
+        """按时间顺序返回指标历史
+
+        每次调用都会从列式存储重建全部记录，开销与历史长度成正比；
+        只需要最新一条时请使用 get_current_metrics()。
+        """
+        order = self._ordered_indices()
+        timestamps = [self._to_datetime(ns) for ns in self._ts[order].tolist()]
+        columns = {name: self._column(name, order).tolist() for name in self._cols}
+        return [
+            PerformanceMetrics(timestamp=timestamp,
+                               **{name: values[i] for name, values in columns.items()})
+            for i, timestamp in enumerate(timestamps)
+        ]
+
     def _calculate_percentile(self, percentile: float) -> float:
         """计算响应时间百分位数"""
-        if not self.execution_times:
-            return 0.0
-
-        sorted_times = sorted(self.execution_times)
-        index = int(len(sorted_times) * percentile / 100)
-        return sorted_times[min(index, len(sorted_times) - 1)]
+        return self._calculate_percentiles(percentile)[0]
+
+    def _calculate_percentiles(self, *percentiles: float) -> List[float]:
+        """一次遍历直方图计算多个响应时间百分位数（按参数顺序返回）"""
+        total = self._execution_total
+        if not total:
+            return [0.0] * len(percentiles)
+
+        # 与排序后取下标 int(n * p / 100) 的语义一致：找到累计计数首次超过该下标的桶。
+        # 按目标下标从小到大逐桶累加，最后一个目标命中后立即停止
+        targets = sorted((min(int(total * p / 100), total - 1), i)
+                         for i, p in enumerate(percentiles))
+        results = [0.0] * len(percentiles)
+        pending = iter(targets)
+        index, slot = next(pending)
+        running = 0
+        for bucket, count in enumerate(self._execution_hist):
+            running += count
+            while running > index:
+                results[slot] = _hdr_value(bucket)
+                try:
+                    index, slot = next(pending)
+                except StopIteration:
+                    return results
+        return results
 
     def record_execution_start(self, node_name: str) -> str:
         """记录节点执行开始"""
@@ -229,6 +444,8 @@ class PerformanceMonitor:
 
         # 记录执行时间
         self.execution_times.append(execution_time)
+        self._execution_hist[_hdr_bucket(execution_time)] += 1
+        self._execution_total += 1
         self.node_execution_counts[node_name] = \
             self.node_execution_counts.get(node_name, 0) + 1
 
@@ -250,36 +467,33 @@ class PerformanceMonitor:
 
     def get_current_metrics(self) -> Optional[PerformanceMetrics]:
         """获取当前性能指标"""
-        return self.metrics_history[-1] if self.metrics_history else None
+        return self._latest
 
     def generate_performance_report(self, duration_minutes: int = 10) -> str:
         """生成性能报告"""
-        cutoff_time = datetime.now() - timedelta(minutes=duration_minutes)
-        recent_metrics = [
-            m for m in self.metrics_history
-            if m.timestamp > cutoff_time
-        ]
+        recent = self._recent_indices(duration_minutes * 60 * _NS_PER_SECOND)
 
-        if not recent_metrics:
+        if not len(recent):
             return "没有可用的性能数据"
 
         # 计算统计数据
-        avg_cpu = sum(m.cpu_usage for m in recent_metrics) / len(recent_metrics)
-        avg_memory = sum(m.memory_usage for m in recent_metrics) / len(recent_metrics)
-        avg_throughput = sum(m.throughput for m in recent_metrics) / len(recent_metrics)
-        max_memory_mb = max(m.memory_mb for m in recent_metrics)
+        avg_cpu = float(self._column("cpu_usage", recent).mean())
+        avg_memory = float(self._column("memory_usage", recent).mean())
+        avg_throughput = float(self._column("throughput", recent).mean())
+        max_memory_mb = float(self._column("memory_mb", recent).max())
 
         # 错误率
         total_executions = sum(self.node_execution_counts.values())
         total_errors = sum(self.error_counts.values())
         error_rate = (total_errors / total_executions * 100) if total_executions > 0 else 0
+        p95, p99 = self._calculate_percentiles(95, 99)
 
         report = f"""
 # LangGraph性能监控报告
 
 ## 时间范围
 - **报告期间**: 最近 {duration_minutes} 分钟
-- **数据点数量**: {len(recent_metrics)}
+- **数据点数量**: {len(recent)}
 
 ## 系统资源使用
 - **平均CPU使用率**: {avg_cpu:.1f}%
@@ -288,8 +502,8 @@ class PerformanceMonitor:
 
 ## 执行性能
 - **平均吞吐量**: {avg_throughput:.2f} 节点/秒
-- **P95响应时间**: {self._calculate_percentile(95):.3f} 秒
-- **P99响应时间**: {self._calculate_percentile(99):.3f} 秒
+- **P95响应时间**: {p95:.3f} 秒
+- **P99响应时间**: {p99:.3f} 秒
 - **错误率**: {error_rate:.2f}%
 
 ## 节点执行统计
@@ -314,13 +528,14 @@ class PerformanceMonitor:
 
         stats = []
         total = sum(self.node_execution_counts.values())
-        for node_name, count in sorted(self.node_execution_counts.items(),
-                                      key=lambda x: x[1], reverse=True):
+        # 只显示前10个，用堆取前10而不必对全部节点排序
+        for node_name, count in heapq.nlargest(10, self.node_execution_counts.items(),
+                                               key=operator.itemgetter(1)):
             percentage = (count / total * 100) if total > 0 else 0
             error_count = self.error_counts.get(node_name, 0)
             stats.append(f"- {node_name}: {count} 次 ({percentage:.1f}%, 错误: {error_count})")
 
-        return "\n".join(stats[:10])  # 只显示前10个
+        return "\n".join(stats)
 
     def _format_tool_stats(self) -> str:
         """格式化工具统计"""
@@ -329,12 +544,13 @@ class PerformanceMonitor:
 
         stats = []
         total = sum(self.tool_call_counts.values())
-        for tool_name, count in sorted(self.tool_call_counts.items(),
-                                     key=lambda x: x[1], reverse=True):
+        # 只显示前10个，用堆取前10而不必对全部工具排序
+        for tool_name, count in heapq.nlargest(10, self.tool_call_counts.items(),
+                                               key=operator.itemgetter(1)):
             percentage = (count / total * 100) if total > 0 else 0
             stats.append(f"- {tool_name}: {count} 次 ({percentage:.1f}%)")
 
-        return "\n".join(stats[:10])  # 只显示前10个
+        return "\n".join(stats)
 
     def _generate_performance_recommendations(self, avg_cpu: float,
                                             avg_memory: float, error_rate: float) -> str:
@@ -372,9 +588,9 @@ class PerformanceMonitor:
                     **asdict(metric),
                     "timestamp": metric.timestamp.isoformat()
                 }
-                for metric in self.metrics_history
+                for metric in self.history_records()
             ],
-            "execution_times": self.execution_times,
+            "execution_times": list(self.execution_times),
             "node_execution_counts": self.node_execution_counts,
             "tool_call_counts": self.tool_call_counts,
             "error_counts": self.error_counts
@@ -473,8 +689,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    # 初始化执行开始时间字典
-    if not hasattr(main, '_execution_starts'):
-        main._execution_starts = {}
-
     asyncio.run(main())
\ No newline at end of file